@@ -1,69 +1,72 @@
-from App.models import Student, ActivityHistory, db  # Import ActivityHistory
+from App.models import Student, Staff, StudentAccolade, db
+from App.models.activity_history import describe_activity
+from App.controllers.milestones import get_milestone_tiers
 from .Command import Command
 
 class AccoladeCommand(Command):
-    
-    def __init__(self, student: Student):
+
+    def __init__(self, student: Student, staff: Staff = None, previous_total: float = None):
+        """previous_total is the student's approved hours before the change being checked.
+
+        When given, only tiers between it and the current total are considered;
+        otherwise every tier up to the current total is checked.
+        """
         self.student = student
-        self.accolades_awarded = [] 
-        
-    def _get_logged_milestones(self):
-        """Internal utility: Queries ActivityHistory to find previously awarded milestones."""
-        
-        awarded_records = ActivityHistory.query.filter_by(
-            student_id=self.student.student_id,
-            command_type='AccoladeCommand'
-        ).all()
-        
-        # Building a set of unique milestone names found in the history descriptions
-        logged_names = set()
-        for record in awarded_records:
-            if '10 Hours Milestone' in record.description:
-                logged_names.add('10 Hours Milestone')
-            if '25 Hours Milestone' in record.description:
-                logged_names.add('25 Hours Milestone')
-            if '50 Hours Milestone' in record.description:
-                logged_names.add('50 Hours Milestone')
-        
-        return logged_names
+        self.staff = staff
+        self.previous_total = previous_total
+        self.accolades_awarded = []
+        self.milestone_ids = []
+
+    def _get_logged_milestones(self, milestone_ids):
+        """Internal utility: Returns which of milestone_ids the student has already been awarded."""
+        if not milestone_ids:
+            return set()
+        return set(db.session.scalars(
+            db.select(StudentAccolade.milestone_id).where(
+                StudentAccolade.student_id == self.student.student_id,
+                StudentAccolade.milestone_id.in_(milestone_ids)
+            )
+        ))
 
     def _calculate_accolades(self):
-        """Internal method to calculate all achievable milestones based on current hours."""
+        """Internal method to find the candidate tiers for the student's current hours."""
         total_hours = self.student.get_total_approved_hours()
-        achievable_milestones = []
-        
-        if total_hours >= 10:
-            achievable_milestones.append('10 Hours Milestone')
-        if total_hours >= 25:
-            achievable_milestones.append('25 Hours Milestone')
-        if total_hours >= 50:
-            achievable_milestones.append('50 Hours Milestone')
-            
-        return achievable_milestones
+        tiers = get_milestone_tiers()
+        if self.previous_total is not None:
+            return tiers.crossed(self.previous_total, total_hours)
+        return tiers.reached(total_hours)
 
     def execute(self):
-        """Checks the student's hours, awards new milestones, and prepares for logging."""
-        
-        # Get current achievable milestones
+        """Checks the student's hours and stages a StudentAccolade row for each new milestone."""
+
+        # Get tiers the student's total has reached (or just crossed)
         achievable = self._calculate_accolades()
-        
-        # Get milestones already logged in history 
-        logged = self._get_logged_milestones()
-        
-        # Determine which milestones are achieved but logged
-        newly_awarded = [m for m in achievable if m not in logged]
-        
-        self.accolades_awarded = newly_awarded
-        
+
+        # Get which of those were already awarded
+        logged = self._get_logged_milestones([tier.id for tier in achievable])
+
+        # Determine which milestones are achieved but not yet awarded
+        newly_awarded = [tier for tier in achievable if tier.id not in logged]
+
+        staff_id = self.staff.staff_id if self.staff else None
+        for tier in newly_awarded:
+            db.session.add(StudentAccolade(self.student.student_id, tier.id, staff_id))
+
+        self.accolades_awarded = [tier.name for tier in newly_awarded]
+        self.milestone_ids = [tier.id for tier in newly_awarded]
+
         if self.accolades_awarded:
             # Command succeeded in finding new awards
             return True
-            
+
         return False
 
+    def get_payload(self):
+        return {
+            'milestones': self.accolades_awarded,
+            'milestone_ids': self.milestone_ids
+        }
+
     def get_description(self):
         """Returns the description that the ActivityLog will save."""
-        if self.accolades_awarded:
-            # Ensure the milestone names are in the description for future history checks
-            return f"Accolades awarded: {', '.join(self.accolades_awarded)}."
-        return f"Accolade check run. No new milestones achieved."
\ No newline at end of file
+        return describe_activity('AccoladeCommand', self.get_payload())
@@ -20,6 +20,10 @@ class Command(ABC):
         # return a simple text description
         pass
 
+    def get_payload(self) -> dict:
+        # return the structured fields stored with the activity entry
+        return {}
+
     def can_execute(self) -> bool:
         # test to see if the command works
         return True
@@ -1,4 +1,5 @@
 from App.models import Request, Staff, db
+from App.models.activity_history import describe_activity
 from .Command import Command
 
 class DenyRequestCommand(Command):
@@ -12,11 +13,19 @@ class DenyRequestCommand(Command):
         """Marks a pending request as denied."""
         if self.request.status != 'pending':
             return False
+        if self.request.is_claimed_by_other(self.staff.staff_id):
+            return False
         
         self.request.status = 'denied'
-        db.session.commit()
+        # Staged only; the invoker's UnitOfWork commits
         return True
 
+    def get_payload(self):
+        return {
+            'request_id': self.request.id,
+            'hours': self.request.hours,
+            'staff_username': self.staff.username
+        }
+
     def get_description(self):
-        return (f"Staff {self.staff.username} denied request {self.request.id} "
-                f"for {self.request.hours} hours.")
\ No newline at end of file
+        return describe_activity('DenyRequestCommand', self.get_payload())
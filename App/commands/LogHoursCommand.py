@@ -1,4 +1,6 @@
 from App.models import Student, Staff, Request, LoggedHours, db
+from App.models.activity_history import describe_activity
+from App.controllers.loader import get_loader
 from .Command import Command
 
 class LogHoursCommand(Command):
@@ -6,12 +8,15 @@ class LogHoursCommand(Command):
     def __init__(self, request: Request, staff: Staff):
         self.request = request
         self.staff = staff
-        self.student = Student.query.get(request.student_id)
+        self.student = get_loader().get(Student, request.student_id)
         
     def execute(self):
         if self.request.status != 'pending':
             print("Error: Request is not pending.")
             return False
+        if self.request.is_claimed_by_other(self.staff.staff_id):
+            # The invoker reports the refusal to the caller
+            return False
         
         # 1. Update Request 
         self.request.status = 'approved'
@@ -25,10 +30,16 @@ class LogHoursCommand(Command):
         )
         db.session.add(logged)
         
-        # 3. Commit the transaction
-        db.session.commit()
+        # 3. Staged only; the invoker's UnitOfWork commits the transaction
         return logged
 
+    def get_payload(self):
+        return {
+            'request_id': self.request.id,
+            'hours': self.request.hours,
+            'username': self.student.username
+        }
+
     def get_description(self):
-        return f"Approved {self.request.hours} hours for Student {self.student.username} (Request {self.request.id})"
+        return describe_activity('LogHoursCommand', self.get_payload())
 
@@ -1,4 +1,5 @@
 from App.models import Student, Request, db
+from App.models.activity_history import describe_activity
 from .Command import Command 
 
 class RequestCommand(Command):
@@ -7,6 +8,7 @@ class RequestCommand(Command):
         """Configures the command with the student (Receiver data) and parameters."""
         self.student = student
         self.hours = hours
+        self.request = None
         
     def execute(self):
         """Creates a new pending Request entry."""
@@ -17,8 +19,17 @@ class RequestCommand(Command):
             status='pending'
         )
         db.session.add(request)
-        db.session.commit()
+        self.request = request
+        # Staged only; the invoker's UnitOfWork commits
         return request
 
+    def get_payload(self):
+        """request_id is only known once the request has been flushed."""
+        return {
+            'request_id': self.request.id if self.request else None,
+            'hours': self.hours,
+            'username': self.student.username
+        }
+
     def get_description(self):
-        return f"Student {self.student.username} requested confirmation for {self.hours} hours."
\ No newline at end of file
+        return describe_activity('RequestCommand', self.get_payload())
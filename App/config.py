@@ -15,5 +15,30 @@ def load_config(app, overrides):
     app.config["JWT_COOKIE_SECURE"] = True
     app.config["JWT_COOKIE_CSRF_PROTECT"] = False
     app.config['FLASK_ADMIN_SWATCH'] = 'darkly'
+    app.config.setdefault('LEADERBOARD_CACHE_TTL', 30)
+    app.config.setdefault('LEADERBOARD_CACHE_SIZE', 256)
+    app.config.setdefault('LEADERBOARD_PAGE_SIZE', 50)
+    app.config.setdefault('LEADERBOARD_MAX_PAGE_SIZE', 500)
+    app.config.setdefault('REQUEST_QUEUE_PAGE_SIZE', 50)
+    app.config.setdefault('REQUEST_QUEUE_MAX_PAGE_SIZE', 500)
+    app.config.setdefault('REQUEST_CLAIM_TTL', 300)
+    app.config.setdefault('REQUEST_CLAIM_MAX', 50)
+    app.config.setdefault('HISTORY_PAGE_SIZE', 50)
+    app.config.setdefault('HISTORY_MAX_PAGE_SIZE', 500)
+    app.config.setdefault('ACTIVITY_LOG_MODE', 'sync')
+    app.config.setdefault('ACTIVITY_LOG_SYNC_COMMANDS', ['RequestCommand', 'LogHoursCommand', 'DenyRequestCommand'])
+    app.config.setdefault('ACTIVITY_LOG_BUFFER_SIZE', 500)
+    app.config.setdefault('ACTIVITY_LOG_BUFFER_SECONDS', 2.0)
+    app.config.setdefault('ACCOLADE_JOBS_ENABLED', False)
+    app.config.setdefault('JOB_BATCH_SIZE', 100)
+    app.config.setdefault('JOB_TIMEOUT', 300)
+    app.config.setdefault('JOB_MAX_ATTEMPTS', 3)
+    app.config.setdefault('JOB_RETENTION_HOURS', 24)
+    app.config.setdefault('EXPORT_BATCH_SIZE', 1000)
+    app.config.setdefault('PASSWORD_HASH_METHOD', 'scrypt')
+    app.config.setdefault('PASSWORD_HASH_WORKERS', 0)
+    app.config.setdefault('PRINCIPAL_CACHE_TTL', 60)
+    app.config.setdefault('PRINCIPAL_CACHE_SIZE', 1024)
+    app.config.setdefault('JWT_DECODE_CACHE_SIZE', 0)
     for key in overrides:
         app.config[key] = overrides[key]
\ No newline at end of file
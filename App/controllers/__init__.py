@@ -1,3 +1,5 @@
 from .user import *
 from .auth import *
 from .initialize import *
+from .loader import get_loader, add_loader_stats
+from .activity_log import add_activity_log_flush
@@ -0,0 +1,98 @@
+import time
+
+from App.database import db
+from App.models import ActivityHistory, LoggedHours, StudentAccolade, Milestone
+from App.models.activity_history import describe_activity
+from App.controllers.milestones import get_milestone_tiers
+
+def backfill_student_accolades(chunk_size=1000):
+    """Migrates milestones recorded in AccoladeCommand history descriptions into StudentAccolade.
+
+    Each (student, milestone) pair keeps its earliest award time and the staff member on
+    that history row. Pairs already present in StudentAccolade are left alone, so the
+    backfill can be re-run safely. Returns the number of rows inserted.
+    """
+    milestone_ids = dict(db.session.execute(db.select(Milestone.name, Milestone.id)).all())
+    existing = set(db.session.execute(db.select(StudentAccolade.student_id, StudentAccolade.milestone_id)))
+
+    awards = {}
+    records = db.session.execute(
+        db.select(ActivityHistory.student_id, ActivityHistory.description,
+                  ActivityHistory.timestamp, ActivityHistory.staff_id)
+        .where(ActivityHistory.command_type == 'AccoladeCommand')
+        .order_by(ActivityHistory.timestamp, ActivityHistory.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    for student_id, description, timestamp, staff_id in records:
+        # Legacy format: "Accolades awarded: 10 Hours Milestone, 25 Hours Milestone."
+        if 'Accolades awarded' not in description:
+            continue
+        for name in description.split(':', 1)[1].split(','):
+            milestone_id = milestone_ids.get(name.strip().rstrip('.'))
+            key = (student_id, milestone_id)
+            if milestone_id is None or key in existing or key in awards:
+                continue
+            awards[key] = {
+                'student_id': student_id,
+                'milestone_id': milestone_id,
+                'awarded_at': timestamp,
+                'staff_id': staff_id
+            }
+
+    rows = list(awards.values())
+    for start in range(0, len(rows), chunk_size):
+        db.session.execute(db.insert(StudentAccolade), rows[start:start + chunk_size])
+    db.session.commit()
+    return len(rows)
+
+def recompute_accolades(chunk_size=5000, progress=None):
+    """Awards every milestone each student has reached but not yet received.
+
+    Approved totals come from one GROUP BY over LoggedHours (so imported rows that
+    skipped the summary hooks still count) and existing awards from one query.
+    Missing awards are computed in memory a chunk of students at a time and written
+    with executemany inserts, one StudentAccolade row and one ActivityHistory entry per
+    award, committing once per chunk.
+
+    progress, if given, is called after each chunk with (students_done, students_total, awards_so_far).
+    Returns a dict with students, awards and elapsed seconds.
+    """
+    start = time.perf_counter()
+    tiers = get_milestone_tiers()
+
+    totals = db.session.execute(
+        db.select(LoggedHours.student_id, db.func.sum(LoggedHours.hours))
+        .where(LoggedHours.status == 'approved')
+        .group_by(LoggedHours.student_id)
+    ).all()
+    awarded = set(db.session.execute(db.select(StudentAccolade.student_id, StudentAccolade.milestone_id)))
+
+    awards = 0
+    for offset in range(0, len(totals), chunk_size):
+        accolade_rows, history_rows = [], []
+        for student_id, total_hours in totals[offset:offset + chunk_size]:
+            for tier in tiers.reached(total_hours):
+                if (student_id, tier.id) in awarded:
+                    continue
+                accolade_rows.append({'student_id': student_id, 'milestone_id': tier.id, 'staff_id': None})
+                payload = {'milestones': [tier.name], 'milestone_ids': [tier.id]}
+                history_rows.append({
+                    'student_id': student_id,
+                    'command_type': 'AccoladeCommand',
+                    'description': describe_activity('AccoladeCommand', payload),
+                    'staff_id': None,
+                    'payload': payload
+                })
+        if accolade_rows:
+            db.session.execute(db.insert(StudentAccolade), accolade_rows)
+            db.session.execute(db.insert(ActivityHistory), history_rows)
+            db.session.commit()
+            awards += len(accolade_rows)
+        if progress:
+            progress(min(offset + chunk_size, len(totals)), len(totals), awards)
+
+    return {
+        'students': len(totals),
+        'awards': awards,
+        'elapsed': time.perf_counter() - start
+    }
@@ -1,41 +1,171 @@
+import atexit, time
+from datetime import datetime
+from threading import Lock
+
+from flask import current_app, g, has_request_context
+
 from App.database import db
-from App.models import Student
-from App.models.activity_history import ActivityHistory 
+from App.models import Student, StudentAccolade, Milestone
+from App.models.activity_history import ActivityHistory, fit_description
 from App.commands.Command import Command
 
+# ACTIVITY_LOG_MODE values: write with the action, once per request, or per worker process
+LOG_MODES = ('sync', 'request', 'worker')
+
+class ActivityLogBuffer():
+    """Activity entries held back to be written together with one multi-row INSERT.
+
+    The rows are written on their own connection and transaction, after the action
+    that produced them has committed, so a buffered entry can be lost if the process
+    dies first. Only commands outside ACTIVITY_LOG_SYNC_COMMANDS are buffered.
+    """
+
+    def __init__(self, max_entries=None, max_age=None):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.written = 0
+        self._rows = []
+        self._oldest = None
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def add(self, row):
+        with self._lock:
+            if not self._rows:
+                self._oldest = time.monotonic()
+            self._rows.append(row)
+
+    def due(self):
+        """True once the buffer holds max_entries rows or its oldest row is max_age seconds old."""
+        with self._lock:
+            if not self._rows:
+                return False
+            if self.max_entries is not None and len(self._rows) >= self.max_entries:
+                return True
+            return self.max_age is not None and time.monotonic() - self._oldest >= self.max_age
+
+    def flush(self, engine):
+        """Writes every buffered row in one INSERT. Returns the number of rows written."""
+        with self._lock:
+            rows, self._rows = self._rows, []
+        if rows:
+            with engine.begin() as connection:
+                connection.execute(db.insert(ActivityHistory.__table__), rows)
+            self.written += len(rows)
+        return len(rows)
+
+def _worker_buffer():
+    """Returns this worker's buffer, creating it (and its exit flush) on first use."""
+    buffer = current_app.extensions.get('activity_log_buffer')
+    if buffer is None:
+        buffer = ActivityLogBuffer(
+            current_app.config['ACTIVITY_LOG_BUFFER_SIZE'],
+            current_app.config['ACTIVITY_LOG_BUFFER_SECONDS']
+        )
+        current_app.extensions['activity_log_buffer'] = buffer
+        atexit.register(buffer.flush, db.engine)
+    return buffer
+
+def _active_buffer():
+    """The buffer new entries go to under the configured mode, or None to write synchronously."""
+    mode = current_app.config['ACTIVITY_LOG_MODE']
+    if mode not in LOG_MODES:
+        raise ValueError(f"Unknown ACTIVITY_LOG_MODE '{mode}'. Use one of: {', '.join(LOG_MODES)}.")
+    if mode == 'worker':
+        return _worker_buffer()
+    if mode == 'request' and has_request_context():
+        if 'activity_log_buffer' not in g:
+            g.activity_log_buffer = ActivityLogBuffer()
+        return g.activity_log_buffer
+    return None
+
+# session.info key for buffered entries waiting on the session's transaction
+PENDING_KEY = 'activity_log_pending'
+
+@db.event.listens_for(db.session, 'after_commit')
+def _release_pending_entries(session):
+    """Hands entries staged in the committed transaction to their buffers."""
+    for buffer, row in session.info.pop(PENDING_KEY, ()):
+        buffer.add(row)
+
+@db.event.listens_for(db.session, 'after_rollback')
+def _discard_pending_entries(session):
+    """Drops entries staged in a rolled back transaction, which describe work that never happened."""
+    session.info.pop(PENDING_KEY, None)
+
+def flush_activity_log(force=False):
+    """Writes buffered activity entries: the request's always, the worker's when due (or forced).
+
+    Returns the number of entries written.
+    """
+    written = 0
+    if has_request_context() and 'activity_log_buffer' in g:
+        written += g.activity_log_buffer.flush(db.engine)
+    buffer = current_app.extensions.get('activity_log_buffer')
+    if buffer is not None and (force or buffer.due()):
+        written += buffer.flush(db.engine)
+    return written
+
+def add_activity_log_flush(app):
+    """Flushes buffered activity entries after each request has committed its own work."""
+    @app.after_request
+    def flush_buffered_activity(response):
+        try:
+            flush_activity_log()
+        except Exception:
+            # The response is already decided; losing buffered audit rows is logged, not raised
+            app.logger.exception("Could not write buffered activity entries")
+        return response
+
 class ActivityLog():
     """Service to handle activity logging and achievement viewing."""
 
     @staticmethod
     def log_command_execution(command: 'Command', student_id: int, staff_id: int = None):
-        """Logs the successful execution of any command to the ActivityHistory model."""
-        
+        """Stages an ActivityHistory entry for an executed command.
+
+        The entry is committed with the rest of the invoker's UnitOfWork, unless
+        ACTIVITY_LOG_MODE buffers it and the command is not in ACTIVITY_LOG_SYNC_COMMANDS.
+        """
+        command_type = command.__class__.__name__
+        payload = command.get_payload()
+        description = fit_description(command.get_description())
+        buffer = None
+        if command_type not in current_app.config['ACTIVITY_LOG_SYNC_COMMANDS']:
+            buffer = _active_buffer()
+        if buffer is not None:
+            # Reaches the buffer only once this transaction commits (and is dropped if it
+            # rolls back); written after the request or worker batch, since writing now from
+            # a second connection could wait on this transaction's own lock
+            db.session.info.setdefault(PENDING_KEY, []).append((buffer, {
+                'student_id': student_id,
+                'command_type': command_type,
+                'description': description,
+                'timestamp': datetime.utcnow(),
+                'staff_id': staff_id,
+                'payload': payload
+            }))
+            return
+
         log_entry = ActivityHistory(
             student_id,
-            command.__class__.__name__,
-            command.get_description(),
-            staff_id # Will be None for student made  reuests or accolade checks
+            command_type,
+            description,
+            staff_id, # Will be None for student made  reuests or accolade checks
+            payload
         )
         db.session.add(log_entry)
-        db.session.commit()
 
     @staticmethod
     def view_accolades_data(student: Student):
-        """Queries ActivityHistory to return a list of previously awarded accolades."""
-        
-        awarded_records = ActivityHistory.query.filter_by(
-            student_id=student.student_id,
-            command_type='AccoladeCommand'
-        ).all()
-        
-        awarded_names = set()
-        for record in awarded_records:
-            # Parse the description saved by the AccoladeCommand
-            if 'Accolades awarded' in record.description:
-                # Simple extraction
-                parts = record.description.split(':')
-                if len(parts) > 1:
-                    for milestone in parts[1].split(','):
-                        awarded_names.add(milestone.strip())
-        
-        return sorted(list(awarded_names))
\ No newline at end of file
+        """Queries StudentAccolade to return the names of the student's awarded milestones."""
+
+        names = db.session.scalars(
+            db.select(Milestone.name)
+            .join(StudentAccolade, StudentAccolade.milestone_id == Milestone.id)
+            .where(StudentAccolade.student_id == student.student_id)
+            .order_by(Milestone.hours, Milestone.id)
+        )
+        return list(names)
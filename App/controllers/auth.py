@@ -1,24 +1,261 @@
-from flask_jwt_extended import create_access_token, jwt_required, JWTManager, get_jwt_identity, verify_jwt_in_request
+import hashlib, time
+from collections import OrderedDict
+from threading import Lock
 
-from App.models import User
+from flask import current_app, request
+from flask_jwt_extended import create_access_token, jwt_required, JWTManager, get_jwt_identity, verify_jwt_in_request, get_current_user
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt.exceptions import PyJWTError
+
+from App.models import User, CacheGeneration
 from App.database import db
+from App.controllers.loader import get_loader
+
+class Principal():
+  """The authenticated user as described by the token's claims.
+
+  Views mostly need only the role and id, which the claims carry, so no row is
+  loaded for them. Any other attribute (email, get_json()...) loads the full User
+  through the request loader on first use.
+  """
+
+  def __init__(self, user_id, role, username, student_id=None, staff_id=None):
+    self.user_id = user_id
+    self.role = role
+    self.username = username
+    self.student_id = student_id
+    self.staff_id = staff_id
+
+  @classmethod
+  def from_user(cls, user):
+    return cls(user.user_id, user.role, user.username,
+               getattr(user, 'student_id', None), getattr(user, 'staff_id', None))
+
+  @classmethod
+  def from_claims(cls, jwt_data):
+    """Returns None for tokens issued before the claims were added."""
+    if 'role' not in jwt_data:
+      return None
+    return cls(int(jwt_data['sub']), jwt_data['role'], jwt_data.get('username'),
+               jwt_data.get('student_id'), jwt_data.get('staff_id'))
+
+  def claims(self):
+    return {
+      'role': self.role,
+      'username': self.username,
+      'student_id': self.student_id,
+      'staff_id': self.staff_id
+    }
+
+  @property
+  def user(self):
+    """The full User row, loaded once per request."""
+    return get_loader().get(User, self.user_id)
+
+  def __getattr__(self, name):
+    # Only called for attributes the claims do not cover
+    user = self.user
+    if user is None:
+      raise AttributeError(name)
+    return getattr(user, name)
+
+  def __repr__(self):
+    return f"[Principal ID={self.user_id} Role={self.role} Username={self.username}]"
+
+# CacheGeneration bumped whenever a user's claims change or a user is deleted
+USERS_GENERATION = 'users'
+
+class PrincipalCache():
+  """Per-worker LRU of principals keyed by token subject, each kept for at most ttl seconds.
+
+  Entries are tagged with the 'users' CacheGeneration they were resolved under and
+  are reused only while it is unchanged, so renaming, re-roling or deleting a user
+  in any worker invalidates the principals held by all of them.
+  """
+
+  def __init__(self, ttl, max_entries):
+    self.ttl = ttl
+    self.max_entries = max_entries
+    self.hits = 0
+    self.misses = 0
+    self._entries = OrderedDict()
+    self._lock = Lock()
+
+  def get(self, subject, generation):
+    if self.ttl <= 0:
+      return None
+    now = time.monotonic()
+    with self._lock:
+      entry = self._entries.get(subject)
+      if entry and entry[0] == generation and now - entry[1] < self.ttl:
+        self._entries.move_to_end(subject)
+        self.hits += 1
+        return entry[2]
+      self.misses += 1
+      return None
+
+  def put(self, subject, generation, principal):
+    if self.ttl <= 0:
+      return
+    with self._lock:
+      self._entries[subject] = (generation, time.monotonic(), principal)
+      self._entries.move_to_end(subject)
+      while len(self._entries) > self.max_entries:
+        self._entries.popitem(last=False)
+
+  def clear(self):
+    with self._lock:
+      self._entries.clear()
+
+  def stats(self):
+    lookups = self.hits + self.misses
+    return {
+      'hits': self.hits,
+      'misses': self.misses,
+      'hit_rate': self.hits / lookups if lookups else 0.0,
+      'entries': len(self._entries),
+      'ttl_seconds': self.ttl
+    }
+
+def get_principal_cache():
+  """Returns the current app's principal cache, creating it on first use."""
+  cache = current_app.extensions.get('principal_cache')
+  if cache is None:
+    cache = PrincipalCache(current_app.config['PRINCIPAL_CACHE_TTL'], current_app.config['PRINCIPAL_CACHE_SIZE'])
+    current_app.extensions['principal_cache'] = cache
+  return cache
+
+@db.event.listens_for(db.session, 'before_flush')
+def _bump_users_generation(session, flush_context, instances):
+  """Bumps the 'users' generation in the same flush as a change to anything the claims carry."""
+  changed = any(isinstance(obj, User) for obj in session.deleted) or any(
+    isinstance(obj, User) and any(db.inspect(obj).attrs[name].history.has_changes() for name in ('username', 'role'))
+    for obj in session.dirty
+  )
+  if changed:
+    CacheGeneration.bump(session, USERS_GENERATION)
+
+def resolve_principal(jwt_data):
+  """Returns the Principal for a verified token's claims, or None if the user no longer exists.
+
+  Served from the principal cache when possible, then from the claims, and only
+  reads the user row for tokens without claims or issued before some user changed.
+  Every worker reads the shared 'users' generation, so a change made through any
+  of them is seen by all of them on their next request.
+  """
+  subject = jwt_data["sub"]
+  generation = CacheGeneration.current(USERS_GENERATION)
+  cache = get_principal_cache()
+  principal = cache.get(subject, generation)
+  if principal is not None:
+    return principal
+
+  if jwt_data.get('users_generation') == generation:
+    principal = Principal.from_claims(jwt_data)
+  if principal is None:
+    try:
+      user_id = int(subject)
+    except (TypeError, ValueError):
+      return None
+    # Shared with the rest of the request, so the row is selected once
+    user = get_loader().get(User, user_id)
+    if user is None:
+      return None
+    principal = Principal.from_user(user)
+  cache.put(subject, generation, principal)
+  return principal
 
 def login(username, password):
   result = db.session.execute(db.select(User).filter_by(username=username))
   user = result.scalar_one_or_none()
   if user and user.check_password(password):
-    # Store ONLY the user id as a string in JWT 'sub'
-    if user.role == 'student':
-      return create_access_token(identity=str(user.student_id))
-    elif user.role == 'staff':
-      return create_access_token(identity=str(user.staff_id))
-    else:
-      return create_access_token(identity=str(user.id))
+    # Upgrade hashes made with old work factors while the plain password is at hand
+    if user.password_needs_rehash():
+      user.set_password(password)
+      db.session.commit()
+    # Store the user id as a string in JWT 'sub', and what views check as claims. The
+    # claims are trusted only until any user's claims change (see resolve_principal)
+    claims = Principal.from_user(user).claims()
+    claims['users_generation'] = CacheGeneration.current(USERS_GENERATION)
+    return create_access_token(identity=str(user.user_id), additional_claims=claims)
   return None
 
 
+class TokenCache():
+  """Bounded LRU of verified token claims, keyed by a SHA-256 of the raw token.
+
+  An entry is only served until the token's own exp, so caching never extends a
+  token's lifetime; a token with any byte changed hashes differently and is
+  verified from scratch.
+  """
+
+  def __init__(self, max_entries):
+    self.max_entries = max_entries
+    self.hits = 0
+    self.misses = 0
+    self._entries = OrderedDict()
+    self._lock = Lock()
+
+  @staticmethod
+  def key(encoded_token):
+    return hashlib.sha256(encoded_token.encode()).hexdigest()
+
+  def get(self, key):
+    now = time.time()
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry and now < entry[0]:
+        self._entries.move_to_end(key)
+        self.hits += 1
+        # Copied so a caller changing its claims cannot change the cached ones
+        return dict(entry[1])
+      if entry:
+        del self._entries[key]
+      self.misses += 1
+      return None
+
+  def put(self, key, claims):
+    if 'exp' not in claims:
+      return  # tokens that never expire are verified every time
+    with self._lock:
+      self._entries[key] = (claims['exp'], dict(claims))
+      self._entries.move_to_end(key)
+      while len(self._entries) > self.max_entries:
+        self._entries.popitem(last=False)
+
+  def stats(self):
+    lookups = self.hits + self.misses
+    return {
+      'hits': self.hits,
+      'misses': self.misses,
+      'hit_rate': self.hits / lookups if lookups else 0.0,
+      'entries': len(self._entries)
+    }
+
+class CachingJWTManager(JWTManager):
+  """JWTManager that skips decoding and signature checks for tokens it has already verified.
+
+  Enabled by JWT_DECODE_CACHE_SIZE > 0. CSRF-checked and expired-token decodes
+  always take the full path.
+  """
+
+  def init_app(self, app, add_context_processor=False):
+    super().init_app(app, add_context_processor)
+    size = app.config['JWT_DECODE_CACHE_SIZE']
+    self.token_cache = TokenCache(size) if size > 0 else None
+
+  def _decode_jwt_from_config(self, encoded_token, csrf_value=None, allow_expired=False):
+    if self.token_cache is None or csrf_value or allow_expired:
+      return super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+    key = TokenCache.key(encoded_token)
+    claims = self.token_cache.get(key)
+    if claims is None:
+      claims = super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+      self.token_cache.put(key, claims)
+    return claims
+
 def setup_jwt(app):
-  jwt = JWTManager(app)
+  jwt = CachingJWTManager(app)
 
   # Always store a string user id in the JWT identity (sub),
   # whether a User object or a raw id is passed.
@@ -29,29 +266,26 @@ def setup_jwt(app):
 
   @jwt.user_lookup_loader
   def user_lookup_callback(_jwt_header, jwt_data):
-    identity = jwt_data["sub"]
-    # Cast back to int primary key
-    try:
-      user_id = int(identity)
-    except (TypeError, ValueError):
-      return None
-    return db.session.get(User, user_id)
+    return resolve_principal(jwt_data)
 
   return jwt
 
 
+def _has_token():
+  """True if the request carries an access token cookie or Authorization header."""
+  return bool(request.cookies.get(current_app.config['JWT_ACCESS_COOKIE_NAME'])
+              or request.headers.get(current_app.config['JWT_HEADER_NAME']))
+
 # Context processor to make 'is_authenticated' available to all templates
 def add_auth_context(app):
   @app.context_processor
   def inject_user():
-      try:
-          verify_jwt_in_request()
-          identity = get_jwt_identity()
-          user_id = int(identity) if identity is not None else None
-          current_user = db.session.get(User, user_id) if user_id is not None else None
-          is_authenticated = current_user is not None
-      except Exception as e:
-          print(e)
-          is_authenticated = False
-          current_user = None
-      return dict(is_authenticated=is_authenticated, current_user=current_user)
\ No newline at end of file
+      current_user = None
+      # Anonymous visitors have nothing to verify
+      if _has_token():
+          try:
+              verify_jwt_in_request(optional=True)
+              current_user = get_current_user()
+          except (JWTExtendedException, PyJWTError):
+              current_user = None
+      return dict(is_authenticated=current_user is not None, current_user=current_user)
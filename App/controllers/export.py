@@ -0,0 +1,117 @@
+import csv, io, json
+from datetime import datetime
+
+from flask import current_app
+
+from App.database import db
+from App.models import ActivityHistory, ActivityHistoryArchive, LoggedHours
+from App.models.activity_history import describe_activity
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+HISTORY_EXPORT_COLUMNS = ['id', 'student_id', 'staff_id', 'command_type', 'timestamp', 'action', 'payload']
+LOGGED_HOURS_EXPORT_COLUMNS = ['id', 'student_id', 'staff_id', 'hours', 'status', 'timestamp']
+
+def parse_export_time(value):
+    """Parses a since/until query value (ISO date or datetime), returning None when absent."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid date '{value}', expected ISO format such as 2024-01-31.")
+
+def _window(stmt, column, since, until):
+    if since:
+        stmt = stmt.where(column >= since)
+    if until:
+        stmt = stmt.where(column < until)
+    return stmt
+
+def _stream_rows(stmt, batch_size):
+    """Yields result rows batch by batch without loading the result or any ORM objects."""
+    result = db.session.execute(stmt.execution_options(yield_per=batch_size))
+    for partition in result.partitions():
+        yield partition
+
+def _history_batches(since, until, batch_size):
+    # Archived entries are older than every hot one, so the archive streams first
+    for model in (ActivityHistoryArchive, ActivityHistory):
+        stmt = _window(
+            db.select(model.id, model.student_id, model.staff_id, model.command_type,
+                      model.timestamp, model.description, model.payload)
+            .order_by(model.timestamp, model.id),
+            model.timestamp, since, until
+        )
+        for rows in _stream_rows(stmt, batch_size):
+            yield [{
+                'id': row.id,
+                'student_id': row.student_id,
+                'staff_id': row.staff_id,
+                'command_type': row.command_type,
+                'timestamp': row.timestamp.isoformat() if row.timestamp else None,
+                'action': describe_activity(row.command_type, row.payload) or row.description,
+                'payload': row.payload
+            } for row in rows]
+
+def _logged_hours_batches(since, until, batch_size):
+    stmt = _window(
+        db.select(LoggedHours.id, LoggedHours.student_id, LoggedHours.staff_id,
+                  LoggedHours.hours, LoggedHours.status, LoggedHours.timestamp)
+        .order_by(LoggedHours.id),
+        LoggedHours.timestamp, since, until
+    )
+    for rows in _stream_rows(stmt, batch_size):
+        yield [{
+            'id': row.id,
+            'student_id': row.student_id,
+            'staff_id': row.staff_id,
+            'hours': row.hours,
+            'status': row.status,
+            'timestamp': row.timestamp.isoformat() if row.timestamp else None
+        } for row in rows]
+
+def _encode(batches, columns, fmt):
+    """Turns batches of row dicts into one text chunk per batch."""
+    if fmt == 'ndjson':
+        for batch in batches:
+            yield ''.join(json.dumps(row) + '\n' for row in batch)
+        return
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, lineterminator='\n')
+    writer.writeheader()
+    for batch in batches:
+        for row in batch:
+            if row.get('payload') is not None:
+                row['payload'] = json.dumps(row['payload'])
+            writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # The header alone when there are no rows
+    if buffer.getvalue():
+        yield buffer.getvalue()
+
+def _export(batches, columns, fmt):
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(EXPORT_FORMATS)}.")
+    return _encode(batches, columns, fmt)
+
+def export_history(fmt='ndjson', since=None, until=None):
+    """Returns a generator of NDJSON or CSV chunks covering hot and archived activity history.
+
+    Rows are read EXPORT_BATCH_SIZE at a time with yield_per and encoded as they
+    arrive, so memory stays flat however many rows there are. Raises ValueError
+    for an unknown format before anything is read.
+    """
+    batches = _history_batches(since, until, current_app.config['EXPORT_BATCH_SIZE'])
+    return _export(batches, HISTORY_EXPORT_COLUMNS, fmt)
+
+def export_logged_hours(fmt='ndjson', since=None, until=None):
+    """Returns a generator of NDJSON or CSV chunks of logged hours, streamed like export_history."""
+    batches = _logged_hours_batches(since, until, current_app.config['EXPORT_BATCH_SIZE'])
+    return _export(batches, LOGGED_HOURS_EXPORT_COLUMNS, fmt)
@@ -0,0 +1,183 @@
+import base64, json
+from datetime import datetime
+
+from App.database import db
+from App.models import ActivityHistory, ActivityHistoryArchive
+from App.controllers.accolades import backfill_student_accolades
+
+def encode_history_cursor(timestamp, entry_id):
+    """Builds the opaque cursor pointing just past (older than) the given history entry."""
+    raw = json.dumps([timestamp.isoformat(), entry_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+def decode_history_cursor(cursor):
+    """Returns (timestamp, id) from a cursor, raising ValueError if it is malformed."""
+    try:
+        timestamp, entry_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(timestamp), int(entry_id)
+    except (TypeError, ValueError, UnicodeError):
+        raise ValueError("Invalid history cursor.")
+
+def _history_records(model, student_id, limit, before=None, command_type=None):
+    stmt = (
+        db.select(model)
+        .where(model.student_id == student_id)
+        .order_by(model.timestamp.desc(), model.id.desc())
+        .limit(limit)
+    )
+    if command_type:
+        stmt = stmt.where(model.command_type == command_type)
+    if before:
+        timestamp, entry_id = before
+        stmt = stmt.where(
+            model.timestamp <= timestamp,
+            db.or_(model.timestamp < timestamp, model.id < entry_id)
+        )
+    return db.session.scalars(stmt).all()
+
+def get_history_page(student_id, limit, before=None, command_type=None):
+    """Returns a student's activity history newest first, `limit` entries at a time.
+
+    The (student_id, timestamp) and (student_id, command_type, timestamp) indexes
+    serve the filter and ordering, so a page costs the same however long the
+    history is. Archived entries are all older than the hot table's, so the archive
+    is only read once a page runs past the hot entries. Returns (entries, next_cursor);
+    next_cursor is None on the last page.
+    """
+    if limit <= 0:
+        raise ValueError("limit must be positive.")
+    cursor = decode_history_cursor(before) if before else None
+
+    records = _history_records(ActivityHistory, student_id, limit, cursor, command_type)
+    if len(records) < limit:
+        if records:
+            cursor = (records[-1].timestamp, records[-1].id)
+        records += _history_records(ActivityHistoryArchive, student_id, limit - len(records), cursor, command_type)
+
+    next_cursor = None
+    if len(records) == limit:
+        next_cursor = encode_history_cursor(records[-1].timestamp, records[-1].id)
+    return [record.get_json() for record in records], next_cursor
+
+def _reuses_history_ids():
+    """True for a SQLite activity_history table created without AUTOINCREMENT.
+
+    SQLite then gives a new row the highest remaining id plus one, so once the newest
+    entries are archived their ids would be handed out again.
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return False
+    sql = db.session.scalar(
+        db.text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {'name': ActivityHistory.__tablename__}
+    )
+    return 'AUTOINCREMENT' not in (sql or '').upper()
+
+def archive_history(older_than, chunk_size=1000, progress=None):
+    """Moves history entries older than now - older_than (a timedelta) into the archive table.
+
+    Each chunk is copied and deleted in its own transaction, so an interrupted run
+    loses nothing and can simply be run again. Accolades recorded only in legacy
+    history descriptions are backfilled into StudentAccolade first. progress, if
+    given, is called with the running total after each chunk. Returns the number
+    of entries moved.
+
+    On a SQLite table that predates AUTOINCREMENT the newest entry is always left
+    in place, so its id (and every archived one) is never reused.
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive.")
+    backfill_student_accolades()
+
+    cutoff = datetime.utcnow() - older_than
+    hot = ActivityHistory.__table__
+    archive = ActivityHistoryArchive.__table__
+    columns = [column.name for column in archive.columns]
+    archivable = hot.c.timestamp < cutoff
+    if _reuses_history_ids():
+        archivable = db.and_(archivable, hot.c.id < db.select(db.func.max(hot.c.id)).scalar_subquery())
+    moved = 0
+    while True:
+        ids = db.session.scalars(
+            db.select(hot.c.id).where(archivable).order_by(hot.c.id).limit(chunk_size)
+        ).all()
+        if not ids:
+            break
+        db.session.execute(
+            db.insert(archive).from_select(columns, db.select(*[hot.c[name] for name in columns]).where(hot.c.id.in_(ids)))
+        )
+        db.session.execute(db.delete(hot).where(hot.c.id.in_(ids)))
+        db.session.commit()
+        moved += len(ids)
+        if progress:
+            progress(moved)
+    return moved
+
+def _payload_entries(command_type, since=None, until=None):
+    """Hot and archived entries of one command type that carry a payload, as one subquery."""
+    selects = []
+    for model in (ActivityHistory, ActivityHistoryArchive):
+        stmt = db.select(model.staff_id, model.timestamp, model.payload).where(
+            model.command_type == command_type, model.payload.isnot(None)
+        )
+        if since:
+            stmt = stmt.where(model.timestamp >= since)
+        if until:
+            stmt = stmt.where(model.timestamp < until)
+        selects.append(stmt)
+    return db.union_all(*selects).subquery()
+
+def hours_approved_by_staff(since=None, until=None):
+    """Returns hours approved and approvals made per staff member, summed in SQL from the payloads."""
+    entries = _payload_entries('LogHoursCommand', since, until)
+    rows = db.session.execute(
+        db.select(entries.c.staff_id,
+                  db.func.sum(entries.c.payload['hours'].as_float()),
+                  db.func.count())
+        .group_by(entries.c.staff_id)
+        .order_by(entries.c.staff_id)
+    )
+    return [{'staff_id': staff_id, 'hours': hours, 'approvals': approvals}
+            for staff_id, hours, approvals in rows]
+
+def requests_per_day(since=None, until=None):
+    """Returns the number of hours requests and hours requested per day, oldest day first."""
+    entries = _payload_entries('RequestCommand', since, until)
+    day = db.func.date(entries.c.timestamp)
+    rows = db.session.execute(
+        db.select(day, db.func.count(), db.func.sum(entries.c.payload['hours'].as_float()))
+        .group_by(day)
+        .order_by(day)
+    )
+    return [{'date': str(date), 'requests': count, 'hours': hours} for date, count, hours in rows]
+
+def create_history_indexes():
+    """Creates the activity history indexes on databases made before they existed.
+
+    create_all() only builds indexes with new tables, so this is the upgrade step
+    for an existing activity_history table; it also creates the archive table if
+    missing. Returns the names of the indexes.
+    """
+    ActivityHistoryArchive.__table__.create(db.engine, checkfirst=True)
+    indexes = ActivityHistory.__table__.indexes | ActivityHistoryArchive.__table__.indexes
+    for index in indexes:
+        index.create(db.engine, checkfirst=True)
+    return sorted(index.name for index in indexes)
+
+def upgrade_history_schema():
+    """Adds the payload column to activity history tables created before it existed.
+
+    Legacy rows keep a NULL payload and render their stored description. Returns the
+    names of the tables that were altered.
+    """
+    create_history_indexes()
+    altered = []
+    inspector = db.inspect(db.engine)
+    for table in (ActivityHistory.__table__, ActivityHistoryArchive.__table__):
+        if 'payload' in {column['name'] for column in inspector.get_columns(table.name)}:
+            continue
+        column_type = table.c.payload.type.compile(dialect=db.engine.dialect)
+        with db.engine.begin() as connection:
+            connection.execute(db.text(f"ALTER TABLE {table.name} ADD COLUMN payload {column_type}"))
+        altered.append(table.name)
+    return altered
@@ -0,0 +1,123 @@
+from App.database import db
+from App.models import Student, Request, LoggedHours, StudentHoursSummary, StudentDailyHours, CacheGeneration
+
+# Totals compared by the consistency checker
+CHECKED_COLUMNS = ('approved_hours', 'pending_hours', 'request_count')
+
+def _empty_totals():
+    return {
+        'approved_hours': 0.0,
+        'pending_hours': 0.0,
+        'request_count': 0,
+        'last_activity': None
+    }
+
+def _expected_summaries():
+    """Aggregates every student's totals straight from LoggedHours and Request."""
+    totals = {}
+
+    def entry(student_id):
+        return totals.setdefault(student_id, _empty_totals())
+
+    logs = db.session.execute(
+        db.select(
+            LoggedHours.student_id,
+            db.func.sum(db.case((LoggedHours.status == 'approved', LoggedHours.hours), else_=0.0)),
+            db.func.max(LoggedHours.timestamp)
+        ).group_by(LoggedHours.student_id)
+    )
+    for student_id, approved, last_log in logs:
+        row = entry(student_id)
+        row['approved_hours'] = approved
+        row['last_activity'] = last_log
+
+    requests = db.session.execute(
+        db.select(
+            Request.student_id,
+            db.func.sum(db.case((Request.status == 'pending', Request.hours), else_=0.0)),
+            db.func.count(Request.id),
+            db.func.max(Request.timestamp)
+        ).group_by(Request.student_id)
+    )
+    for student_id, pending, count, last_request in requests:
+        row = entry(student_id)
+        row['pending_hours'] = pending
+        row['request_count'] = count
+        if last_request and (row['last_activity'] is None or last_request > row['last_activity']):
+            row['last_activity'] = last_request
+
+    return totals
+
+def rebuild_hours_summaries():
+    """Replaces every StudentHoursSummary row with totals recomputed from the source tables.
+
+    Students without any hours or requests get a zeroed row. Returns the number of rows written.
+    """
+    totals = _expected_summaries()
+    for student_id in db.session.scalars(db.select(Student.student_id)):
+        totals.setdefault(student_id, _empty_totals())
+    db.session.execute(db.delete(StudentHoursSummary))
+    if totals:
+        db.session.execute(
+            db.insert(StudentHoursSummary),
+            [dict(student_id=student_id, **row) for student_id, row in totals.items()]
+        )
+    CacheGeneration.bump(db.session, 'leaderboard')
+    db.session.commit()
+    return len(totals)
+
+def check_hours_summaries(tolerance=1e-6):
+    """Compares stored summary rows against the source tables.
+
+    Returns a list of mismatches, each a dict with student_id, field, expected and actual.
+    A student with no summary row at all (e.g. created before the table existed) is left
+    off the leaderboard, so it is reported with field 'summary_row'.
+    """
+    expected = _expected_summaries()
+    stored = {row.student_id: row for row in db.session.scalars(db.select(StudentHoursSummary))}
+    mismatches = [
+        {'student_id': student_id, 'field': 'summary_row', 'expected': 'present', 'actual': 'missing'}
+        for student_id in db.session.scalars(
+            db.select(Student.student_id).where(Student.student_id.notin_(db.select(StudentHoursSummary.student_id)))
+            .order_by(Student.student_id)
+        )
+    ]
+
+    for student_id in sorted(set(expected) | set(stored)):
+        want = expected.get(student_id)
+        have = stored.get(student_id)
+        for column in CHECKED_COLUMNS:
+            expected_value = want[column] if want else 0
+            actual_value = getattr(have, column) if have else 0
+            if abs(expected_value - actual_value) > tolerance:
+                mismatches.append({
+                    'student_id': student_id,
+                    'field': column,
+                    'expected': expected_value,
+                    'actual': actual_value
+                })
+
+    return mismatches
+
+def rebuild_daily_hours():
+    """Replaces every StudentDailyHours bucket with sums of approved LoggedHours per student per day.
+
+    Returns the number of buckets written.
+    """
+    day = db.func.date(LoggedHours.timestamp, type_=db.Date)
+    buckets = db.session.execute(
+        db.select(LoggedHours.student_id, day, db.func.sum(LoggedHours.hours))
+        .where(LoggedHours.status == 'approved')
+        .group_by(LoggedHours.student_id, day)
+    ).all()
+
+    db.session.execute(db.delete(StudentDailyHours))
+    if buckets:
+        db.session.execute(
+            db.insert(StudentDailyHours),
+            [{'student_id': student_id, 'day': bucket_day, 'approved_hours': hours}
+             for student_id, bucket_day, hours in buckets]
+        )
+    CacheGeneration.bump(db.session, 'leaderboard')
+    db.session.commit()
+    return len(buckets)
@@ -0,0 +1,192 @@
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from App.database import db
+from App.models import Job, Student, Staff
+from App.commands.AccoladeCommand import AccoladeCommand
+from .activity_log import ActivityLog
+from .unit_of_work import UnitOfWork
+from .loader import get_loader
+from .request_queue import SKIP_LOCKED_DIALECTS
+
+ACCOLADE_CHECK = 'accolade_check'
+
+# Recent finished jobs sampled for the latency figures in queue_stats
+LATENCY_SAMPLE = 500
+
+def enqueue_job(kind, key, payload=None):
+    """Stages a job in the caller's transaction unless the same (kind, key) is still queued.
+
+    Returns the new job, or the queued one it was coalesced into.
+    """
+    existing = db.session.scalar(
+        db.select(Job).where(Job.kind == kind, Job.key == str(key), Job.status == 'queued').limit(1)
+    )
+    if existing is not None:
+        return existing
+    job = Job(kind, key, payload)
+    db.session.add(job)
+    return job
+
+def enqueue_accolade_check(student_id, staff_id=None):
+    return enqueue_job(ACCOLADE_CHECK, student_id, {'student_id': student_id, 'staff_id': staff_id})
+
+def _run_accolade_checks(jobs):
+    """Runs AccoladeCommand once per student, loading every student and staff member up front."""
+    loader = get_loader()
+    students = loader.get_many(Student, [job.payload['student_id'] for job in jobs])
+    staff = loader.get_many(Staff, [job.payload.get('staff_id') for job in jobs])
+    for job in jobs:
+        student = students.get(job.payload['student_id'])
+        if student is None:
+            continue  # deleted since the job was queued
+        staff_id = job.payload.get('staff_id')
+        command = AccoladeCommand(student, staff.get(staff_id))
+        if command.execute():
+            ActivityLog.log_command_execution(command, student.student_id, staff_id)
+
+# Handlers receive every claimed job of their kind and only stage changes
+JOB_HANDLERS = {
+    ACCOLADE_CHECK: _run_accolade_checks,
+}
+
+def claim_jobs(batch_size, timeout):
+    """Marks up to batch_size of the oldest runnable jobs as running for this worker.
+
+    Jobs left running longer than timeout seconds (a crashed worker) are runnable
+    again. The candidate ids are selected first (with FOR UPDATE SKIP LOCKED where
+    supported, as claim_requests does; MySQL rejects LIMIT inside an IN subquery),
+    then a compare-and-set UPDATE re-checks each one, so two workers never claim
+    the same job.
+    """
+    now = datetime.utcnow()
+    worker = uuid.uuid4().hex[:16]
+    runnable = db.or_(
+        Job.status == 'queued',
+        db.and_(Job.status == 'running', Job.started_at < now - timedelta(seconds=timeout))
+    )
+    oldest = db.select(Job.id).where(runnable).order_by(Job.id).limit(batch_size)
+    if db.session.get_bind().dialect.name in SKIP_LOCKED_DIALECTS:
+        oldest = oldest.with_for_update(skip_locked=True)
+    ids = db.session.scalars(oldest).all()
+    if not ids:
+        db.session.commit()
+        return []
+    db.session.execute(
+        db.update(Job)
+        .where(Job.id.in_(ids), runnable)
+        .values(status='running', worker=worker, started_at=now, attempts=Job.attempts + 1)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return db.session.scalars(
+        db.select(Job).where(Job.worker == worker, Job.status == 'running').order_by(Job.id)
+    ).all()
+
+def _finish(job, status, error=None):
+    job.status = status
+    job.error = error[:255] if error else None
+    if status == 'queued':
+        job.worker = None
+        job.started_at = None
+    else:
+        job.finished_at = datetime.utcnow()
+
+def _fail(job, error, max_attempts):
+    """Requeues a failed job, or marks it failed once it has used its attempts."""
+    with UnitOfWork():
+        _finish(job, 'failed' if job.attempts >= max_attempts else 'queued', error)
+    return job.status
+
+def run_pending_jobs(batch_size=None):
+    """Claims one batch of jobs and runs it. Returns counts of claimed, done, retried and failed jobs.
+
+    Each kind's jobs run together and are marked done in the same transaction. If
+    that transaction fails, the jobs are retried one at a time so a single bad job
+    cannot block the rest of the batch.
+    """
+    config = current_app.config
+    max_attempts = config['JOB_MAX_ATTEMPTS']
+    jobs = claim_jobs(batch_size or config['JOB_BATCH_SIZE'], config['JOB_TIMEOUT'])
+    counts = {'claimed': len(jobs), 'done': 0, 'retried': 0, 'failed': 0}
+
+    by_kind = defaultdict(list)
+    for job in jobs:
+        if job.kind not in JOB_HANDLERS:
+            counts[_fail(job, f"Unknown job kind '{job.kind}'.", 0)] += 1
+        elif job.attempts > max_attempts:
+            counts[_fail(job, "Gave up after a worker timed out on every attempt.", 0)] += 1
+        else:
+            by_kind[job.kind].append(job)
+
+    for kind, group in by_kind.items():
+        handler = JOB_HANDLERS[kind]
+        try:
+            with UnitOfWork():
+                handler(group)
+                for job in group:
+                    _finish(job, 'done')
+            counts['done'] += len(group)
+            continue
+        except Exception:
+            current_app.logger.exception("Job batch of %s failed, retrying one at a time", kind)
+
+        for job in group:
+            try:
+                with UnitOfWork():
+                    handler([job])
+                    _finish(job, 'done')
+                counts['done'] += 1
+            except Exception as e:
+                status = _fail(job, str(e) or e.__class__.__name__, max_attempts)
+                counts['retried' if status == 'queued' else 'failed'] += 1
+    return counts
+
+def queue_stats():
+    """Returns queue depth per status and kind, the oldest queued job's age and recent latencies.
+
+    wait is the time from enqueue to a worker starting the job, total adds the run
+    time; both are in seconds over the last LATENCY_SAMPLE finished jobs.
+    """
+    depth = defaultdict(dict)
+    for kind, status, count in db.session.execute(
+        db.select(Job.kind, Job.status, db.func.count(Job.id)).group_by(Job.kind, Job.status)
+    ):
+        depth[status][kind] = count
+
+    oldest = db.session.scalar(db.select(db.func.min(Job.created_at)).where(Job.status == 'queued'))
+    now = datetime.utcnow()
+    recent = db.session.execute(
+        db.select(Job.created_at, Job.started_at, Job.finished_at)
+        .where(Job.status == 'done')
+        .order_by(Job.finished_at.desc())
+        .limit(LATENCY_SAMPLE)
+    ).all()
+
+    def latency(values):
+        if not values:
+            return None
+        ordered = sorted(values)
+        return {
+            'mean': sum(ordered) / len(ordered),
+            'p95': ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+        }
+
+    return {
+        'depth': {status: dict(kinds) for status, kinds in depth.items()},
+        'queued': sum(depth['queued'].values()) if 'queued' in depth else 0,
+        'oldest_queued_seconds': (now - oldest).total_seconds() if oldest else None,
+        'wait_seconds': latency([(row.started_at - row.created_at).total_seconds() for row in recent]),
+        'total_seconds': latency([(row.finished_at - row.created_at).total_seconds() for row in recent])
+    }
+
+def purge_finished_jobs(older_than):
+    """Deletes jobs that finished successfully before now - older_than (a timedelta). Returns the count."""
+    result = db.session.execute(
+        db.delete(Job).where(Job.status == 'done', Job.finished_at < datetime.utcnow() - older_than)
+    )
+    db.session.commit()
+    return result.rowcount
@@ -0,0 +1,275 @@
+import base64, json, time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from threading import Lock
+
+from flask import current_app
+
+from App.database import db
+from App.models import Student, StudentHoursSummary, StudentDailyHours, CacheGeneration
+
+# Secondary sort keys used to order students with the same approved total
+TIE_BREAKS = {
+    'student_id': StudentHoursSummary.student_id,
+    'username': Student.username,
+}
+
+# Time windows accepted by get_window_range
+WINDOWS = ('week', 'month', 'custom')
+
+class LeaderboardCache():
+    """Per-worker cache of computed leaderboard pages.
+
+    Entries are tagged with the 'leaderboard' CacheGeneration they were built from and
+    are reused only while that generation is unchanged and the entry is younger than
+    the TTL, so a bump from any worker invalidates the copies held by all of them.
+    """
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get_or_compute(self, key, compute):
+        if self.ttl <= 0:
+            return compute()
+        generation = CacheGeneration.current('leaderboard')
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == generation and now - entry[1] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+
+        rows = compute()
+        with self._lock:
+            self._entries[key] = (generation, now, rows)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return rows
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self._entries),
+            'ttl_seconds': self.ttl
+        }
+
+def get_leaderboard_cache():
+    """Returns the current app's leaderboard cache, creating it on first use."""
+    cache = current_app.extensions.get('leaderboard_cache')
+    if cache is None:
+        cache = LeaderboardCache(
+            current_app.config['LEADERBOARD_CACHE_TTL'],
+            current_app.config['LEADERBOARD_CACHE_SIZE']
+        )
+        current_app.extensions['leaderboard_cache'] = cache
+    return cache
+
+def get_leaderboard(limit=None, offset=0, tie_break='student_id', use_cache=True):
+    """Ranks students by approved hours read from their maintained summary rows.
+
+    Args:
+        limit (int): maximum number of rows to return (None returns every student).
+        offset (int): number of ranked rows to skip.
+        tie_break (str): key from TIE_BREAKS used to order students with equal hours.
+        use_cache (bool): serve from the per-worker LeaderboardCache when possible.
+
+    Returns a list of dicts with rank, student_id, username and total_hours.
+    """
+    if tie_break not in TIE_BREAKS:
+        raise ValueError(f"Unknown tie break '{tie_break}'. Use one of: {', '.join(TIE_BREAKS)}.")
+    if limit is not None and limit < 0:
+        raise ValueError("limit must not be negative.")
+    if offset < 0:
+        raise ValueError("offset must not be negative.")
+
+    if not use_cache:
+        return _query_leaderboard(limit, offset, tie_break)
+    return get_leaderboard_cache().get_or_compute(
+        (limit, offset, tie_break),
+        lambda: _query_leaderboard(limit, offset, tie_break)
+    )
+
+def _query_leaderboard(limit, offset, tie_break):
+    summary = StudentHoursSummary
+    stmt = (
+        db.select(summary.student_id, Student.username, summary.approved_hours)
+        .join(Student, Student.student_id == summary.student_id)
+        .order_by(summary.approved_hours.desc(), TIE_BREAKS[tie_break].asc())
+        .offset(offset)
+    )
+    if limit is not None:
+        stmt = stmt.limit(limit)
+
+    return [
+        {
+            'rank': offset + position,
+            'student_id': row.student_id,
+            'username': row.username,
+            'total_hours': row.approved_hours
+        }
+        for position, row in enumerate(db.session.execute(stmt), 1)
+    ]
+
+def encode_cursor(total_hours, student_id):
+    """Builds the opaque keyset cursor pointing just past the given leaderboard row."""
+    raw = json.dumps([total_hours, student_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+def decode_cursor(cursor):
+    """Returns (total_hours, student_id) from a cursor, raising ValueError if it is malformed."""
+    try:
+        total_hours, student_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(total_hours), int(student_id)
+    except (TypeError, ValueError, UnicodeError):
+        raise ValueError("Invalid leaderboard cursor.")
+
+def get_leaderboard_page(limit, after=None, use_cache=True):
+    """Returns the next `limit` students after `after` using keyset pagination.
+
+    Ordering is (total_hours desc, student_id asc), read straight off the summary
+    rank index, so each page costs the same however deep into the board it is.
+
+    Returns (rows, next_cursor); next_cursor is None once the board is exhausted.
+    """
+    if limit <= 0:
+        raise ValueError("limit must be positive.")
+    position = decode_cursor(after) if after else None
+
+    def compute():
+        summary = StudentHoursSummary
+        stmt = (
+            db.select(summary.student_id, Student.username, summary.approved_hours)
+            .join(Student, Student.student_id == summary.student_id)
+            .order_by(summary.approved_hours.desc(), summary.student_id.asc())
+            .limit(limit)
+        )
+        if position:
+            hours, student_id = position
+            stmt = stmt.where(
+                summary.approved_hours <= hours,
+                db.or_(summary.approved_hours < hours, summary.student_id > student_id)
+            )
+        return [
+            {
+                'student_id': row.student_id,
+                'username': row.username,
+                'total_hours': row.approved_hours
+            }
+            for row in db.session.execute(stmt)
+        ]
+
+    if use_cache:
+        rows = get_leaderboard_cache().get_or_compute(('keyset', limit, position), compute)
+    else:
+        rows = compute()
+    next_cursor = None
+    if len(rows) == limit:
+        next_cursor = encode_cursor(rows[-1]['total_hours'], rows[-1]['student_id'])
+    return rows, next_cursor
+
+def get_student_rank(student_id):
+    """Returns a student's leaderboard position by counting the students ranked ahead.
+
+    The count is a range scan of the summary rank index, so no other rows are sorted.
+    Returns None when the student does not exist.
+    """
+    summary = StudentHoursSummary
+    row = db.session.execute(
+        db.select(summary.approved_hours, Student.username)
+        .join(Student, Student.student_id == summary.student_id)
+        .where(summary.student_id == student_id)
+    ).one_or_none()
+    if row is None:
+        return None
+
+    ahead = db.session.scalar(
+        db.select(db.func.count())
+        .select_from(summary)
+        .where(db.or_(
+            summary.approved_hours > row.approved_hours,
+            db.and_(summary.approved_hours == row.approved_hours, summary.student_id < student_id)
+        ))
+    )
+    return {
+        'rank': ahead + 1,
+        'student_id': student_id,
+        'username': row.username,
+        'total_hours': row.approved_hours
+    }
+
+def get_window_range(window, start=None, end=None, today=None):
+    """Returns the inclusive (start, end) dates covered by a leaderboard window.
+
+    'week' is the current Monday-Sunday week, 'month' the current calendar month and
+    'custom' uses the given start/end dates. Days are UTC, matching LoggedHours.timestamp.
+    """
+    today = today or datetime.utcnow().date()
+    if window == 'week':
+        monday = today - timedelta(days=today.weekday())
+        return monday, monday + timedelta(days=6)
+    if window == 'month':
+        first = today.replace(day=1)
+        next_month = (first + timedelta(days=32)).replace(day=1)
+        return first, next_month - timedelta(days=1)
+    if window == 'custom':
+        if not start or not end:
+            raise ValueError("A custom window needs both from and to dates.")
+        if start > end:
+            raise ValueError("from must not be after to.")
+        return start, end
+    raise ValueError(f"Unknown window '{window}'. Use one of: {', '.join(WINDOWS)}.")
+
+def get_window_leaderboard(start, end, limit=None, offset=0, use_cache=True):
+    """Ranks students by approved hours logged between start and end (inclusive).
+
+    Sums the per-day StudentDailyHours buckets instead of scanning LoggedHours, so the
+    cost depends on the days in the window rather than the size of the log. Only
+    students with hours in the window are listed.
+    """
+    if limit is not None and limit < 0:
+        raise ValueError("limit must not be negative.")
+    if offset < 0:
+        raise ValueError("offset must not be negative.")
+
+    def compute():
+        buckets = StudentDailyHours
+        total_hours = db.func.sum(buckets.approved_hours).label('total_hours')
+        stmt = (
+            db.select(buckets.student_id, Student.username, total_hours)
+            .join(Student, Student.student_id == buckets.student_id)
+            .where(buckets.day >= start, buckets.day <= end)
+            .group_by(buckets.student_id, Student.username)
+            .having(total_hours > 0)
+            .order_by(total_hours.desc(), buckets.student_id.asc())
+            .offset(offset)
+        )
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        return [
+            {
+                'rank': offset + position,
+                'student_id': row.student_id,
+                'username': row.username,
+                'total_hours': row.total_hours
+            }
+            for position, row in enumerate(db.session.execute(stmt), 1)
+        ]
+
+    if not use_cache:
+        return compute()
+    return get_leaderboard_cache().get_or_compute(('window', start, end, limit, offset), compute)
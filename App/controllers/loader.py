@@ -0,0 +1,106 @@
+from flask import current_app, g, has_request_context
+
+from App.database import db
+
+class Loader():
+    """Request-scoped identity cache that batches primary key lookups.
+
+    Views, controllers, invokers and commands that fetch the same Staff, Request or
+    Student share one Loader per HTTP request, so each row is selected once.
+    get_many() fetches every id not seen yet in a single IN query.
+
+    Instances are keyed by (base model, id), so a User loaded for the JWT identity
+    also answers a Staff or Student lookup with the same id.
+    """
+
+    def __init__(self):
+        self._instances = {}
+        self._missing = set()
+        self.lookups = 0
+        self.queries = 0
+
+    @staticmethod
+    def _key(model, id):
+        return db.inspect(model).base_mapper.class_, id
+
+    def _cached(self, model, id):
+        """Returns (found, instance) for a remembered lookup, dropping deleted rows."""
+        if (model, id) in self._missing:
+            return True, None
+        key = self._key(model, id)
+        instance = self._instances.get(key)
+        if instance is None:
+            return False, None
+        state = db.inspect(instance)
+        if state.deleted or state.was_deleted or state.detached:
+            del self._instances[key]
+            return True, None
+        return True, instance if isinstance(instance, model) else None
+
+    def add(self, *instances):
+        """Remembers instances that were loaded some other way."""
+        for instance in instances:
+            mapper = db.inspect(instance).mapper
+            self._instances[self._key(mapper.class_, mapper.primary_key_from_instance(instance)[0])] = instance
+
+    def get(self, model, id):
+        """Returns the model instance with this primary key, or None."""
+        if id is None:
+            return None
+        return self.get_many(model, [id]).get(id)
+
+    def get_many(self, model, ids):
+        """Returns {id: instance} for the ids that exist, loading unseen ones in one query."""
+        ids = [id for id in ids if id is not None]
+        self.lookups += len(ids)
+        wanted = set(ids)
+        found = {}
+        for id in list(wanted):
+            cached, instance = self._cached(model, id)
+            if cached:
+                wanted.discard(id)
+                if instance is not None:
+                    found[id] = instance
+
+        if wanted:
+            primary_key = db.inspect(model).primary_key[0]
+            rows = db.session.scalars(db.select(model).where(primary_key.in_(wanted))).all()
+            self.queries += 1
+            self.add(*rows)
+            for row in rows:
+                found[db.inspect(row).mapper.primary_key_from_instance(row)[0]] = row
+            self._missing.update((model, id) for id in wanted if id not in found)
+
+        return {id: found[id] for id in ids if id in found}
+
+    def stats(self):
+        return {
+            'lookups': self.lookups,
+            'queries': self.queries,
+            'saved': self.lookups - self.queries
+        }
+
+def get_loader():
+    """Returns the Loader for the current HTTP request.
+
+    Outside a request (CLI commands, tests) each call gets a fresh Loader, so
+    nothing is cached across unrelated work in a long-lived app context.
+    """
+    if not has_request_context():
+        return Loader()
+    if 'loader' not in g:
+        g.loader = Loader()
+    return g.loader
+
+def add_loader_stats(app):
+    """In debug mode, reports how many queries the request's Loader saved."""
+    @app.after_request
+    def report_loader_stats(response):
+        loader = g.get('loader')
+        if app.debug and loader is not None:
+            stats = loader.stats()
+            current_app.logger.debug(
+                "Loader: %(lookups)s lookups, %(queries)s queries, %(saved)s saved", stats
+            )
+            response.headers['X-Loader-Saved'] = str(stats['saved'])
+        return response
@@ -0,0 +1,71 @@
+from bisect import bisect_right
+from collections import namedtuple
+
+from flask import current_app
+
+from App.database import db
+from App.models import Milestone, StudentAccolade, CacheGeneration
+
+Tier = namedtuple('Tier', ['id', 'name', 'hours'])
+
+class MilestoneTiers():
+    """Milestones sorted by threshold so a total can be located with bisect."""
+
+    def __init__(self, tiers, generation=0):
+        self.tiers = sorted(tiers, key=lambda tier: (tier.hours, tier.id))
+        self.thresholds = [tier.hours for tier in self.tiers]
+        self.by_id = {tier.id: tier for tier in self.tiers}
+        self.generation = generation
+
+    def reached(self, total_hours):
+        """Every tier at or below total_hours. O(log n + k)."""
+        return self.tiers[:bisect_right(self.thresholds, total_hours)]
+
+    def crossed(self, previous_total, new_total):
+        """Tiers reached by new_total but not by previous_total. O(log n + k)."""
+        low = bisect_right(self.thresholds, previous_total)
+        high = bisect_right(self.thresholds, new_total)
+        return self.tiers[low:high]
+
+    def name(self, milestone_id):
+        tier = self.by_id.get(milestone_id)
+        return tier.name if tier else None
+
+def get_milestone_tiers():
+    """Returns the app's milestone tiers, loading them once per worker.
+
+    The tiers are reloaded only when the 'milestones' cache generation moves,
+    which add_milestone/remove_milestone bump for every worker.
+    """
+    generation = CacheGeneration.current('milestones')
+    tiers = current_app.extensions.get('milestone_tiers')
+    if tiers is None or tiers.generation != generation:
+        rows = db.session.execute(db.select(Milestone.id, Milestone.name, Milestone.hours))
+        tiers = MilestoneTiers([Tier(*row) for row in rows], generation)
+        current_app.extensions['milestone_tiers'] = tiers
+    return tiers
+
+def get_all_milestones():
+    return db.session.scalars(db.select(Milestone).order_by(Milestone.hours, Milestone.id)).all()
+
+def add_milestone(name, hours):
+    if hours <= 0:
+        raise ValueError("Milestone hours must be positive.")
+    if db.session.scalar(db.select(Milestone.id).where(Milestone.name == name)):
+        raise ValueError(f"Milestone '{name}' already exists.")
+    milestone = Milestone(name, hours)
+    db.session.add(milestone)
+    CacheGeneration.bump(db.session, 'milestones')
+    db.session.commit()
+    return milestone
+
+def remove_milestone(milestone_id):
+    milestone = db.session.get(Milestone, milestone_id)
+    if not milestone:
+        raise ValueError(f"Milestone with id {milestone_id} not found.")
+    if db.session.scalar(db.select(StudentAccolade.id).where(StudentAccolade.milestone_id == milestone_id).limit(1)):
+        raise ValueError(f"Milestone '{milestone.name}' has already been awarded and cannot be removed.")
+    db.session.delete(milestone)
+    CacheGeneration.bump(db.session, 'milestones')
+    db.session.commit()
+    return True
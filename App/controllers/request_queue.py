@@ -0,0 +1,160 @@
+import base64, json
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from App.database import db
+from App.models import Student, Request
+
+def encode_queue_cursor(timestamp, request_id):
+    """Builds the opaque keyset cursor pointing just past the given queue row."""
+    raw = json.dumps([timestamp.isoformat(), request_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+def decode_queue_cursor(cursor):
+    """Returns (timestamp, request_id) from a cursor, raising ValueError if it is malformed."""
+    try:
+        timestamp, request_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(timestamp), int(request_id)
+    except (TypeError, ValueError, UnicodeError):
+        raise ValueError("Invalid request queue cursor.")
+
+def pending_requests_query(student_id=None, start=None, end=None, min_hours=None, max_hours=None):
+    """Selects pending requests with their student's username, oldest first.
+
+    start and end are inclusive dates compared against the (UTC) request timestamp.
+    The status filter and ordering are served by the (status, timestamp) index.
+    """
+    if start and end and start > end:
+        raise ValueError("from must not be after to.")
+    if min_hours is not None and max_hours is not None and min_hours > max_hours:
+        raise ValueError("min_hours must not be greater than max_hours.")
+
+    stmt = (
+        db.select(Request.id, Request.student_id, Student.username, Request.hours, Request.status, Request.timestamp)
+        .join(Student, Student.student_id == Request.student_id)
+        .where(Request.status == 'pending')
+        .order_by(Request.timestamp.asc(), Request.id.asc())
+    )
+    if student_id is not None:
+        stmt = stmt.where(Request.student_id == student_id)
+    if start:
+        stmt = stmt.where(Request.timestamp >= datetime.combine(start, datetime.min.time()))
+    if end:
+        stmt = stmt.where(Request.timestamp < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+    if min_hours is not None:
+        stmt = stmt.where(Request.hours >= min_hours)
+    if max_hours is not None:
+        stmt = stmt.where(Request.hours <= max_hours)
+    return stmt
+
+# Backends whose SELECT ... FOR UPDATE SKIP LOCKED lets concurrent claimers pass each other
+SKIP_LOCKED_DIALECTS = ('postgresql', 'mysql', 'mariadb')
+
+def _claimable(now):
+    """Pending requests whose lease is free or has expired."""
+    return db.and_(
+        Request.status == 'pending',
+        db.or_(Request.claimed_until.is_(None), Request.claimed_until <= now)
+    )
+
+def claim_requests(staff_id, n, ttl=None):
+    """Leases up to n of the oldest claimable pending requests to a staff member.
+
+    On PostgreSQL/MySQL the candidates are locked with FOR UPDATE SKIP LOCKED, so
+    concurrent claimers skip each other's rows instead of waiting. Elsewhere (SQLite)
+    a single compare-and-set UPDATE re-checks that each lease is still free, so two
+    staff can never win the same request. Expired leases are claimable again.
+
+    Returns (rows, claimed_until) with rows shaped like fetch_pending_requests.
+    """
+    if n <= 0:
+        raise ValueError("n must be positive.")
+    ttl = ttl if ttl is not None else current_app.config['REQUEST_CLAIM_TTL']
+    now = datetime.utcnow()
+    # Whole seconds, so the read-back below matches on DATETIME columns that drop microseconds
+    claimed_until = (now + timedelta(seconds=ttl)).replace(microsecond=0)
+    oldest = (
+        db.select(Request.id)
+        .where(_claimable(now))
+        .order_by(Request.timestamp.asc(), Request.id.asc())
+        .limit(n)
+    )
+
+    if db.session.get_bind().dialect.name in SKIP_LOCKED_DIALECTS:
+        # The selected rows stay locked until the commit, so every one of them is won
+        ids = db.session.scalars(oldest.with_for_update(skip_locked=True)).all()
+        target = won = Request.id.in_(ids)
+    else:
+        # SQLite has no row locks; the subquery and the lease check run inside one UPDATE
+        target = db.and_(Request.id.in_(oldest.scalar_subquery()), _claimable(now))
+        won = db.and_(Request.claimed_by == staff_id, Request.claimed_until == claimed_until)
+
+    db.session.execute(
+        db.update(Request)
+        .where(target)
+        # Bumping the version makes a review based on an earlier read of the row conflict
+        .values(claimed_by=staff_id, claimed_until=claimed_until, version=Request.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+    rows = db.session.execute(pending_requests_query().where(won)).all()
+    return [_queue_row(row) for row in rows], claimed_until
+
+def _queue_row(row):
+    return {
+        'id': row.id,
+        'student_id': row.student_id,
+        'student_name': row.username,
+        'hours': row.hours,
+        'status': row.status,
+        'timestamp': row.timestamp.isoformat()
+    }
+
+def fetch_pending_requests(limit, after=None, **filters):
+    """Returns the next `limit` pending requests after `after` using keyset pagination.
+
+    filters are passed to pending_requests_query. Returns (rows, next_cursor);
+    next_cursor is None once the queue is exhausted.
+    """
+    if limit <= 0:
+        raise ValueError("limit must be positive.")
+    stmt = pending_requests_query(**filters).limit(limit)
+    if after:
+        timestamp, request_id = decode_queue_cursor(after)
+        stmt = stmt.where(
+            Request.timestamp >= timestamp,
+            db.or_(Request.timestamp > timestamp, Request.id > request_id)
+        )
+
+    rows = [_queue_row(row) for row in db.session.execute(stmt)]
+    next_cursor = None
+    if len(rows) == limit:
+        next_cursor = encode_queue_cursor(datetime.fromisoformat(rows[-1]['timestamp']), rows[-1]['id'])
+    return rows, next_cursor
+
+def upgrade_request_schema():
+    """Adds the review lease and version columns and the queue index to a request table made before them.
+
+    Existing rows start unclaimed at version 1. Returns the names of the columns added.
+    """
+    table = Request.__table__
+    existing = {column['name'] for column in db.inspect(db.engine).get_columns(table.name)}
+    constraints = {
+        'claimed_by': 'REFERENCES staff (staff_id)',
+        'version': 'NOT NULL DEFAULT 1'
+    }
+    added = []
+    with db.engine.begin() as connection:
+        for column in (table.c.claimed_by, table.c.claimed_until, table.c.version):
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            connection.execute(db.text(
+                f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type} {constraints.get(column.name, '')}".rstrip()
+            ))
+            added.append(column.name)
+    for index in table.indexes:
+        index.create(db.engine, checkfirst=True)
+    return added
@@ -1,61 +1,65 @@
 from App.database import db
 from App.models import User,Staff,Student,Request, LoggedHours
 from App.controllers.staff_invoker import StaffService
+from App.controllers.loader import get_loader
+from App.controllers.request_queue import pending_requests_query
+from App.controllers.user import create_account
+
+# Actions accepted by process_batch_review and the largest batch it takes
+BATCH_ACTIONS = ('approve', 'deny')
+MAX_BATCH_SIZE = 500
 
 def register_staff(name,email,password): #registers a new staff member
-    new_staff = Staff.create_staff(name, email, password)
+    # Raises DuplicateUserError if the name or email is taken
+    new_staff = create_account(Staff.create_staff, name, email, password)
     return new_staff
 
 def fetch_all_requests(): #fetches all pending requests for staff to review
-    pending_requests = Request.query.filter_by(status='pending').all()
-    if not pending_requests:
-        return []
-    
-    requests_data=[]
-    for req in pending_requests:
-        student = Student.query.get(req.student_id)
-        student_name = student.username if student else "Unknown"
-        
-        requests_data.append({
-            'id': req.id,
-            'student_name': student_name,
-            'hours': req.hours,
-            'status':req.status
-        })
-    
-    return requests_data
+    # One joined query brings the student names along with the requests
+    return [
+        {
+            'id': row.id,
+            'student_name': row.username,
+            'hours': row.hours,
+            'status': row.status
+        }
+        for row in db.session.execute(pending_requests_query())
+    ]
 
 def process_request_approval(staff_id, request_id): 
-    staff = Staff.query.get(staff_id)
+    loader = get_loader()
+    staff = loader.get(Staff, staff_id)
     if not staff:
         raise ValueError(f"Staff with id {staff_id} not found.")
     
-    request = Request.query.get(request_id)
+    request = loader.get(Request, request_id)
     if not request:
         raise ValueError(f"Request with id {request_id} not found.")
     
-    student = Student.query.get(request.student_id)
+    student = loader.get(Student, request.student_id)
     name = student.username if student else "Unknown" # should always find student if data integrity is maintained
-    logged = StaffService.approve_request_action(staff_id, request_id)
+    logged, message = StaffService.approve_request_action(staff_id, request_id)
 
 
     return {
         'request': request,
         'student_name': name,
         'staff_name': staff.username,
-        'logged_hours': logged
+        'logged_hours': logged,
+        'message': message
     }
 
 def process_request_denial(staff_id, request_id): #staff denies a student's hours request
-    staff = Staff.query.get(staff_id)
+    loader = get_loader()
+    staff = loader.get(Staff, staff_id)
     if not staff:
         raise ValueError(f"Staff with id {staff_id} not found.")
     
-    request = Request.query.get(request_id)
+    request = loader.get(Request, request_id)
     if not request:
         raise ValueError(f"Request with id {request_id} not found.")
     
-    student = Student.query.get(request.student_id)
+    student = loader.get(Student, request.student_id)
     name = student.username if student else "Unknown"
     denied = StaffService.deny_request_action(staff_id, request_id)
     
@@ -66,6 +70,37 @@ def process_request_denial(staff_id, request_id): #staff denies a student's hour
         'denial_successful': denied
     }
     
+def process_batch_review(staff_id, items): #staff approves/denies many requests at once
+    """Validates a list of {request_id, action} items and reviews them in one transaction.
+
+    Raises ValueError for a malformed batch. Returns the per-item results together
+    with any accolades awarded, keyed by student id.
+    """
+    if not isinstance(items, list) or not items:
+        raise ValueError("items must be a non-empty list.")
+    if len(items) > MAX_BATCH_SIZE:
+        raise ValueError(f"A batch may contain at most {MAX_BATCH_SIZE} items.")
+
+    parsed = []
+    for position, item in enumerate(items):
+        if not isinstance(item, dict) or not isinstance(item.get('request_id'), int):
+            raise ValueError(f"Item {position} needs an integer request_id.")
+        if item.get('action') not in BATCH_ACTIONS:
+            raise ValueError(f"Item {position} action must be one of: {', '.join(BATCH_ACTIONS)}.")
+        parsed.append((item['request_id'], item['action']))
+
+    results, accolades = StaffService.batch_review_action(staff_id, parsed)
+    return {
+        'results': results,
+        'approved': sum(1 for result in results if result['status'] == 'approved'),
+        'denied': sum(1 for result in results if result['status'] == 'denied'),
+        'failed': sum(1 for result in results if result['status'] not in ('approved', 'denied')),
+        'accolades': [
+            {'student_id': student_id, 'accolades': names}
+            for student_id, names in accolades.items()
+        ]
+    }
+
 def get_all_staff_json(): #returns all staff members in JSON format
     staff_members = Staff.query.all()
     return [staff.get_json() for staff in staff_members]
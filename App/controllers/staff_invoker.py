@@ -1,8 +1,15 @@
+from collections import defaultdict
+
+from flask import current_app
+
 from App.models import Student, Staff, Request, db
 from App.commands.LogHoursCommand import LogHoursCommand
 from App.commands.DenyRequestCommand import DenyRequestCommand
 from App.commands.AccoladeCommand import AccoladeCommand
 from .activity_log import ActivityLog
+from .unit_of_work import UnitOfWork
+from .loader import get_loader
+from .jobs import enqueue_accolade_check
 from App.models.activity_history import ActivityHistory 
 
 
@@ -12,41 +19,56 @@ class StaffService():
     @staticmethod
     def approve_request_action(staff_id: int, request_id: int):
         """Action that triggers the LogHoursCommand."""
-        staff = Staff.query.get(staff_id)
-        request = Request.query.get(request_id)
-        student = Student.query.get(request.student_id)
+        loader = get_loader()
+        staff = loader.get(Staff, staff_id)
+        request = loader.get(Request, request_id)
         
         if not staff or not request:
             return None, "Staff or Request not found."
+        student = loader.get(Student, request.student_id)
             
         # 1. Client creates and configures the Command
         command = LogHoursCommand(request, staff)
         
-        # 2. Invoker calls execute()
-        new_logged = command.execute()
-        
-    
-        ActivityLog.log_command_execution(command, request.student_id)
+        # Every step below is committed together when the unit of work exits
+        with UnitOfWork() as uow:
+            # 2. Invoker calls execute(), flushing so the summary total includes the new hours
+            new_logged = uow.run(command, flush=True)
+            if not new_logged:
+                # Nothing was staged, so there is nothing to log or check for accolades
+                if request.status == 'pending' and request.is_claimed_by_other(staff_id):
+                    return None, "Request is claimed by another staff member."
+                return None, "Request could not be approved (status was not pending)."
 
+            # History feeds the approval analytics, so only hours actually logged are recorded
+            ActivityLog.log_command_execution(command, request.student_id, staff_id)
 
-          # 3. Invoker creates and executes the Accolade Command
-        #    This checks if the new loggedhours makes the student eligible for a milestone
-        accolade_command = AccoladeCommand(student)
-        accolade_success = accolade_command.execute() 
+            if current_app.config['ACCOLADE_JOBS_ENABLED']:
+                # 3. The accolade check runs later in `flask worker`; repeat approvals share one job
+                enqueue_accolade_check(student.student_id, staff_id)
+                return new_logged, "Request approved successfully."
 
-        # 4. Invoker logs the Accolade Command execution if successful
-        if accolade_success:
-             ActivityLog.log_command_execution(accolade_command, student.student_id, staff_id) 
+            # 3. Invoker creates and executes the Accolade Command
+            #    This checks if the new loggedhours makes the student eligible for a milestone
+            #    Only the tiers between the previous and new totals need checking
+            previous_total = student.get_total_approved_hours() - new_logged.hours
+            accolade_command = AccoladeCommand(student, staff, previous_total)
+            accolade_success = uow.run(accolade_command)
 
-        return new_logged
+            # 4. Invoker logs the Accolade Command execution if successful
+            if accolade_success:
+                 ActivityLog.log_command_execution(accolade_command, student.student_id, staff_id) 
+
+        return new_logged, "Request approved successfully."
 
     @staticmethod
     def deny_request_action(staff_id: int, request_id: int):
         """Action that triggers the DenyRequestCommand."""
         
         # 1. Invoker fetches necessary models (Client/Context/Data)
-        staff = Staff.query.get(staff_id)
-        request = Request.query.get(request_id)
+        loader = get_loader()
+        staff = loader.get(Staff, staff_id)
+        request = loader.get(Request, request_id)
         
         if not staff:
             return None, "Error: Staff member not found."
@@ -56,13 +78,94 @@ class StaffService():
         # 2. Invoker creates and configures the Command
         command = DenyRequestCommand(request=request, staff=staff)
         
-        # 3. Invoker calls execute()
-        success = command.execute()
+        # 3. Invoker calls execute() and commits the change with its log entry
+        with UnitOfWork() as uow:
+            success = uow.run(command)
+            if success:
+                # 4. Invoker logs the command execution (Fulfills history feature)
+                ActivityLog.log_command_execution(command, request.student_id, staff_id)
         
         if success:
-            # 4. Invoker logs the command execution (Fulfills history feature)
-            ActivityLog.log_command_execution(command, request.student_id, staff_id)
             return True, "Request denied successfully."
         else:
             # Handle cases where the command failed 
+            if request.status == 'pending' and request.is_claimed_by_other(staff_id):
+                return False, "Request is claimed by another staff member."
             return False, "Request could not be denied (status was not pending)."
+
+    @staticmethod
+    def batch_review_action(staff_id: int, items):
+        """Approves or denies many requests in one transaction.
+
+        items is a list of (request_id, action) pairs with action 'approve' or 'deny'.
+        Requests and students are loaded with one IN query each, every command is
+        staged in a single UnitOfWork, and the accolade check runs once per student
+        whose hours went up. Returns (results, accolades) where results holds one
+        dict per item in order and accolades maps student_id to newly awarded names.
+        """
+        loader = get_loader()
+        staff = loader.get(Staff, staff_id)
+        if not staff:
+            raise ValueError(f"Staff with id {staff_id} not found.")
+
+        requests = loader.get_many(Request, {request_id for request_id, _ in items})
+        student_ids = {req.student_id for req in requests.values()}
+        # Loads the students (and their totals) into the identity map for the commands below
+        students = {
+            student.student_id: student for student in
+            db.session.scalars(
+                db.select(Student)
+                .where(Student.student_id.in_(student_ids))
+                .options(db.selectinload(Student.hours_summary))
+            )
+        } if student_ids else {}
+        # Lets LogHoursCommand find each student without another query
+        loader.add(*students.values())
+        previous_totals = {
+            student_id: student.get_total_approved_hours() for student_id, student in students.items()
+        }
+
+        results = []
+        approved_students = set()
+        with UnitOfWork() as uow:
+            with db.session.no_autoflush:
+                for request_id, action in items:
+                    result = {'request_id': request_id, 'action': action}
+                    results.append(result)
+                    req = requests.get(request_id)
+                    if req is None:
+                        result['status'] = 'not_found'
+                        continue
+
+                    if req.status == 'pending' and req.is_claimed_by_other(staff_id):
+                        result['status'] = 'claimed'
+                        continue
+
+                    if action == 'approve':
+                        command = LogHoursCommand(req, staff)
+                    else:
+                        command = DenyRequestCommand(request=req, staff=staff)
+                    if not uow.run(command):
+                        result['status'] = 'not_pending'
+                        continue
+
+                    ActivityLog.log_command_execution(command, req.student_id, staff_id)
+                    if action == 'approve':
+                        approved_students.add(req.student_id)
+                    result['status'] = req.status
+
+            # Totals are read after the flush so each student is checked against all of their new hours
+            uow.flush()
+            accolades = defaultdict(list)
+            for student_id in sorted(approved_students):
+                if current_app.config['ACCOLADE_JOBS_ENABLED']:
+                    # Awarded later by `flask worker`
+                    enqueue_accolade_check(student_id, staff_id)
+                    continue
+                student = students[student_id]
+                accolade_command = AccoladeCommand(student, staff, previous_totals[student_id])
+                if uow.run(accolade_command):
+                    ActivityLog.log_command_execution(accolade_command, student_id, staff_id)
+                    accolades[student_id] = accolade_command.accolades_awarded
+
+        return results, dict(accolades)
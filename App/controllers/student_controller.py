@@ -1,21 +1,25 @@
 from App.database import db
 from App.models import User,Staff,Student,Request
 from App.controllers.student_invoker import StudentService
+from App.controllers.loader import get_loader
+from App.controllers.leaderboard import get_leaderboard
+from App.controllers.user import create_account
 
 def register_student(name,email,password):
-    new_student=Student.create_student(name,email,password)
+    # Raises DuplicateUserError if the name or email is taken
+    new_student=create_account(Student.create_student,name,email,password)
     return new_student
 
 def get_approved_hours(student_id): #calculates and returns the total approved hours for a student
-    student = Student.query.get(student_id)
+    student = get_loader().get(Student, student_id)
     if not student:
         raise ValueError(f"Student with id {student_id} not found.")
     
-    total_hours = sum(lh.hours for lh in student.loggedhours if lh.status == 'approved')
+    total_hours = student.get_total_approved_hours()
     return (student.username,total_hours)
 
 def create_hours_request(student_id,hours): #creates a new hours request for a student
-    student = Student.query.get(student_id)
+    student = get_loader().get(Student, student_id)
     if not student:
         raise ValueError(f"Student with id {student_id} not found.")
     
@@ -23,37 +27,31 @@ def create_hours_request(student_id,hours): #creates a new hours request for a s
     return req
 
 def fetch_requests(student_id): #fetch requests for a student
-    student = Student.query.get(student_id)
+    student = get_loader().get(Student, student_id)
     if not student:
         raise ValueError(f"Student with id {student_id} not found.")
     
     return student.requests
 
 def fetch_accolades(student_id): #fetch accolades for a student
-    student = Student.query.get(student_id)
+    student = get_loader().get(Student, student_id)
     if not student:
         raise ValueError(f"Student with id {student_id} not found.")
     
     accolades = StudentService.view_accolades(student_id)
     return accolades
 
-def generate_leaderboard():
-    students = Student.query.all()
-    leaderboard = []
-    for student in students:
-        total_hours=sum(lh.hours for lh in student.loggedhours if lh.status == 'approved')
-
-        leaderboard.append({
-            'name': student.username,
-            'hours': total_hours
-        })
-
-    leaderboard.sort(key=lambda item: item['hours'], reverse=True)
-
-    return leaderboard
+def generate_leaderboard(limit=None, offset=0, tie_break='student_id'):
+    return [
+        {
+            'name': row['username'],
+            'hours': row['total_hours']
+        }
+        for row in get_leaderboard(limit=limit, offset=offset, tie_break=tie_break)
+    ]
 
 def get_activity_history(student_id): #fetch activity history for a student
-    student = Student.query.get(student_id)
+    student = get_loader().get(Student, student_id)
     if not student:
         raise ValueError(f"Student with id {student_id} not found.")
     
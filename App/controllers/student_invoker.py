@@ -1,7 +1,9 @@
 from App.models import Student, db
 from App.commands.RequestCommand import RequestCommand
 from App.controllers.activity_log import ActivityLog
-from App.models.activity_history import ActivityHistory 
+from App.controllers.unit_of_work import UnitOfWork
+from App.controllers.loader import get_loader
+from App.models.activity_history import ActivityHistory, ActivityHistoryArchive
 
 class StudentService():
     """Invoker and Query Layer for student-related features."""
@@ -9,17 +11,19 @@ class StudentService():
     @staticmethod
     def create_hours_request(student_id: int, hours: float):
         """Invoker action: Creates and executes the RequestConfirmationCommand."""
-        student = Student.query.get(student_id)
+        student = get_loader().get(Student, student_id)
         
         if not student:
             return None, "Student not found."
             
         # 1. Invoker creates and executes Command
         command = RequestCommand(student=student, hours=hours)
-        new_request = command.execute()
+        with UnitOfWork() as uow:
+            # Flushed so the logged payload carries the new request's id
+            new_request = uow.run(command, flush=True)
         
-        # 2. Invoker logs the command execution 
-        ActivityLog.log_command_execution(command, student_id, staff_id=None) 
+            # 2. Invoker logs the command execution, committed together with the request
+            ActivityLog.log_command_execution(command, student_id, staff_id=None) 
         
         return new_request
     #, "Request submitted successfully. Accolade check run."
@@ -29,14 +33,16 @@ class StudentService():
     def view_activity_history(student_id: int):
         """Queries the ActivityHistory log for the student."""
         # Fulfills the special feature requirement 
-        history_records = ActivityHistory.query.filter_by(student_id=student_id).order_by(ActivityHistory.timestamp.desc()).all()
+        history_records = ActivityHistory.query.filter_by(student_id=student_id).order_by(ActivityHistory.timestamp.desc(), ActivityHistory.id.desc()).all()
+        # Archived entries are older than every hot one, so they follow on
+        history_records += ActivityHistoryArchive.query.filter_by(student_id=student_id).order_by(ActivityHistoryArchive.timestamp.desc(), ActivityHistoryArchive.id.desc()).all()
         
         return [record.get_json() for record in history_records]
 
     @staticmethod
     def view_accolades(student_id: int):
         """Queries the ActivityHistory via ActivityLog to return a list of awarded accolades."""
-        student = Student.query.get(student_id)
+        student = get_loader().get(Student, student_id)
         if not student:
             return []
         
@@ -0,0 +1,71 @@
+from sqlalchemy.orm.exc import StaleDataError
+
+from App.database import db
+
+class ConcurrentUpdateError(Exception):
+    """A row changed in another transaction between being read and being written."""
+
+class UnitOfWork():
+    """Transaction boundary for one invoker action.
+
+    Commands only stage their changes on the session; the unit of work commits them
+    all once when the block exits, or rolls everything back if it raises, so an
+    activity entry can never be stored without the change it describes.
+
+    Units of work nest: only the outermost one commits, so an invoker action can be
+    reused inside a larger batch without committing part of it early.
+
+        with UnitOfWork() as uow:
+            logged = uow.run(command, flush=True)
+            ActivityLog.log_command_execution(command, student_id)
+    """
+
+    def __init__(self, flush_each=False):
+        """flush_each flushes after every run(), e.g. when later steps need generated ids."""
+        self.session = db.session
+        self.flush_each = flush_each
+        self.outermost = False
+
+    def __enter__(self):
+        if self.session.info.get('unit_of_work') is None:
+            self.session.info['unit_of_work'] = self
+            self.outermost = True
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if not self.outermost:
+            return False
+        del self.session.info['unit_of_work']
+        if exc_type is not None:
+            self.session.rollback()
+            if issubclass(exc_type, StaleDataError):
+                # Raised by an autoflush inside the block
+                raise ConcurrentUpdateError(str(exc)) from exc
+            return False
+        try:
+            self.session.commit()
+        except StaleDataError as e:
+            self.session.rollback()
+            raise ConcurrentUpdateError(str(e)) from e
+        except Exception:
+            self.session.rollback()
+            raise
+        return False
+
+    def run(self, command, flush=False):
+        """Executes a command and returns its result, flushing afterwards if asked.
+
+        Flushing sends the staged rows (and the summary hooks' updates) to the
+        database without committing, for steps that read them back.
+        """
+        result = command.execute()
+        if flush or self.flush_each:
+            self.flush()
+        return result
+
+    def flush(self):
+        """Flushes staged changes, raising ConcurrentUpdateError if a versioned row moved on."""
+        try:
+            self.session.flush()
+        except StaleDataError as e:
+            raise ConcurrentUpdateError(str(e)) from e
@@ -1,5 +1,8 @@
+from sqlalchemy.exc import IntegrityError
+
 from App.models import User,Request,LoggedHours
 from App.database import db
+from App.controllers.leaderboard import get_leaderboard, get_leaderboard_page, get_student_rank, get_window_range, get_window_leaderboard
 
 def create_user(username, password, email):
     newuser = User(username=username, password=password, email=email)
@@ -7,6 +10,58 @@ def create_user(username, password, email):
     db.session.commit()
     return newuser
 
+class DuplicateUserError(ValueError):
+    """The username or email is already taken (compared ignoring case)."""
+
+def find_duplicate_user(username, email):
+    """Returns 'username' or 'email' for the field already taken, or None.
+
+    A single lookup served by the lower(username) and lower(email) indexes, instead
+    of loading every user.
+    """
+    username, email = username.lower(), email.lower()
+    row = db.session.execute(
+        db.select(db.func.lower(User.username))
+        .where(db.or_(db.func.lower(User.username) == username, db.func.lower(User.email) == email))
+        .limit(1)
+    ).first()
+    if row is None:
+        return None
+    return 'username' if row[0] == username else 'email'
+
+def create_account(create, username, email, password):
+    """Calls create(username, email, password) if neither the username nor the email is taken.
+
+    The unique indexes still catch a concurrent registration that slips past the
+    check; either way a DuplicateUserError is raised and nothing is stored.
+    """
+    taken = find_duplicate_user(username, email)
+    if taken:
+        raise DuplicateUserError(f"A user with that {taken} already exists.")
+    try:
+        return create(username, email, password)
+    except IntegrityError:
+        db.session.rollback()
+        raise DuplicateUserError("A user with that username or email already exists.")
+
+def create_user_indexes():
+    """Adds the case-insensitive unique indexes to a users table made before they existed.
+
+    Raises ValueError listing the usernames or emails that differ only by case, which
+    must be resolved first. Returns the names of the indexes.
+    """
+    duplicates = []
+    for column in (User.username, User.email):
+        duplicates += db.session.scalars(
+            db.select(db.func.lower(column)).group_by(db.func.lower(column)).having(db.func.count() > 1)
+        ).all()
+    if duplicates:
+        raise ValueError(f"Resolve users that differ only by case first: {', '.join(duplicates)}")
+    indexes = [index for index in User.__table__.indexes if index.name.startswith('uq_users_')]
+    for index in indexes:
+        index.create(db.engine, checkfirst=True)
+    return sorted(index.name for index in indexes)
+
 def get_user_by_username(username):
     result = db.session.execute(db.select(User).filter_by(username=username))
     return result.scalar_one_or_none()
@@ -33,19 +88,48 @@ def update_user(id, username):
         return True
     return None
 
-def view_leaderboard():
-    from App.models.student import Student
-    students = db.session.scalars(db.select(Student)).all()
-    leaderboard = []
-    for student in students:
-        total_hours = sum(lh.hours for lh in student.loggedhours if lh.status == 'approved')
-        leaderboard.append({
-            'student_id': student.student_id,
-            'username': student.username,
-            'total_approved_hours': total_hours
-        })
-    leaderboard.sort(key=lambda x: x['total_approved_hours'], reverse=True)
-    return leaderboard
+def view_leaderboard(limit=None, offset=0, tie_break='student_id'):
+    return [
+        {
+            'student_id': row['student_id'],
+            'username': row['username'],
+            'total_approved_hours': row['total_hours']
+        }
+        for row in get_leaderboard(limit=limit, offset=offset, tie_break=tie_break)
+    ]
+
+def view_leaderboard_page(limit, after=None):
+    rows, next_cursor = get_leaderboard_page(limit, after)
+    return [
+        {
+            'student_id': row['student_id'],
+            'username': row['username'],
+            'total_approved_hours': row['total_hours']
+        }
+        for row in rows
+    ], next_cursor
+
+def view_window_leaderboard(window, start=None, end=None, limit=None, offset=0):
+    start, end = get_window_range(window, start, end)
+    return [
+        {
+            'student_id': row['student_id'],
+            'username': row['username'],
+            'total_approved_hours': row['total_hours']
+        }
+        for row in get_window_leaderboard(start, end, limit=limit, offset=offset)
+    ]
+
+def view_student_rank(student_id):
+    rank = get_student_rank(student_id)
+    if not rank:
+        return None
+    return {
+        'rank': rank['rank'],
+        'student_id': rank['student_id'],
+        'username': rank['username'],
+        'total_approved_hours': rank['total_hours']
+    }
 
 def get_all_requests_json():
     
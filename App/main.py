@@ -11,7 +11,9 @@ from App.config import load_config
 
 from App.controllers import (
     setup_jwt,
-    add_auth_context
+    add_auth_context,
+    add_loader_stats,
+    add_activity_log_flush
 )
 
 from App.views import views, setup_admin
@@ -27,6 +29,8 @@ def create_app(overrides={}):
     load_config(app, overrides)
     CORS(app)
     add_auth_context(app)
+    add_loader_stats(app)
+    add_activity_log_flush(app)
     photos = UploadSet('photos', TEXT + DOCUMENTS + IMAGES)
     configure_uploads(app, photos)
     add_views(app)
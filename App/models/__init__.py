@@ -3,4 +3,10 @@ from .student import Student
 from .staff import Staff
 from .request import Request
 from .loggedhours import LoggedHours
-from .activity_history import ActivityHistory
\ No newline at end of file
+from .activity_history import ActivityHistory, ActivityHistoryArchive
+from .cache_generation import CacheGeneration
+from .student_hours_summary import StudentHoursSummary
+from .student_daily_hours import StudentDailyHours
+from .milestone import Milestone
+from .student_accolade import StudentAccolade
+from .job import Job
\ No newline at end of file
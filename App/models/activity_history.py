@@ -1,5 +1,30 @@
+from datetime import datetime
+
 from App.database import db
 
+# Renders each command's description from its payload; see Command.get_payload()
+ACTIVITY_DESCRIPTIONS = {
+    'RequestCommand': lambda p: f"Student {p['username']} requested confirmation for {p['hours']} hours.",
+    'LogHoursCommand': lambda p: f"Approved {p['hours']} hours for Student {p['username']} (Request {p['request_id']})",
+    'DenyRequestCommand': lambda p: f"Staff {p['staff_username']} denied request {p['request_id']} for {p['hours']} hours.",
+    'AccoladeCommand': lambda p: (f"Accolades awarded: {', '.join(p['milestones'])}." if p['milestones']
+                                  else "Accolade check run. No new milestones achieved."),
+}
+
+# Stored descriptions are cut to fit; the full text is always rendered from the payload
+DESCRIPTION_LENGTH = 255
+
+def fit_description(description):
+    """Truncates a description to DESCRIPTION_LENGTH, e.g. an accolade entry naming several long tiers."""
+    if len(description) <= DESCRIPTION_LENGTH:
+        return description
+    return description[:DESCRIPTION_LENGTH - 3] + '...'
+
+def describe_activity(command_type, payload):
+    """Returns the human-readable sentence for a command's payload, or None for an unknown command."""
+    render = ACTIVITY_DESCRIPTIONS.get(command_type)
+    return render(payload) if render and payload is not None else None
+
 class ActivityHistory(db.Model):
     """Stores a persistent record of every executed command."""
     
@@ -8,23 +33,67 @@ class ActivityHistory(db.Model):
     
     # Store key details of the executed command
     command_type = db.Column(db.String(50), nullable=False)
-    description = db.Column(db.String(255), nullable=False)
-    timestamp = db.Column(db.DateTime, default=db.func.current_timestamp())
+    description = db.Column(db.String(DESCRIPTION_LENGTH), nullable=False)
+    # Set in Python (UTC, microseconds) so rows written in the same second keep their order
+    # and compare correctly against history cursors
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     staff_id = db.Column(db.Integer, db.ForeignKey('staff.staff_id'), nullable=True)
+    # Structured fields of the command (request_id, hours, milestones...); NULL on legacy rows
+    payload = db.Column(db.JSON(none_as_null=True), nullable=True)
 
+    # History pages are a student's entries newest first, optionally of one command type.
+    # AUTOINCREMENT stops SQLite handing an archived entry's id to a new one
+    __table_args__ = (
+        db.Index('ix_activity_history_student_timestamp', student_id, timestamp),
+        db.Index('ix_activity_history_student_command', student_id, command_type, timestamp),
+        {'sqlite_autoincrement': True},
+    )
 
-    def __init__ (self, student_id, command_type, description, staff_id):
+    def __init__ (self, student_id, command_type, description, staff_id, payload=None):
         self.student_id = student_id
         self.command_type = command_type
         self.description = description
         self.staff_id = staff_id
+        self.payload = payload
 
     def __repr__(self):
         return f"[Activity ID = {self.id} Timestamp = {self.timestamp} Command Type = {self.command_type} Description = {self.description} Student ID = {self.student_id} Staff ID = {self.staff_id}]"
 
+    def render_description(self):
+        """Renders the description from the payload, falling back to the stored text for legacy rows."""
+        return describe_activity(self.command_type, self.payload) or self.description
+
     def get_json(self):
         return {
             'timestamp': str(self.timestamp),
-            'action': self.description,
-            'command_type': self.command_type
-        }
\ No newline at end of file
+            'action': self.render_description(),
+            'command_type': self.command_type,
+            'payload': self.payload
+        }
+
+class ActivityHistoryArchive(db.Model):
+    """Cold storage for ActivityHistory entries moved out by `flask history archive`.
+
+    Rows keep their original id, so history cursors stay valid across the move. The
+    table has no foreign keys; it is only read by history pages.
+    """
+
+    __tablename__ = "activity_history_archive"
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    student_id = db.Column(db.Integer, nullable=False)
+    command_type = db.Column(db.String(50), nullable=False)
+    description = db.Column(db.String(DESCRIPTION_LENGTH), nullable=False)
+    timestamp = db.Column(db.DateTime)
+    staff_id = db.Column(db.Integer, nullable=True)
+    payload = db.Column(db.JSON(none_as_null=True), nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_activity_history_archive_student_timestamp', student_id, timestamp),
+        db.Index('ix_activity_history_archive_student_command', student_id, command_type, timestamp),
+    )
+
+    def __repr__(self):
+        return f"[Archived Activity ID = {self.id} Timestamp = {self.timestamp} Command Type = {self.command_type} Student ID = {self.student_id}]"
+
+    render_description = ActivityHistory.render_description
+    get_json = ActivityHistory.get_json
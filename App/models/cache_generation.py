@@ -0,0 +1,33 @@
+from App.database import db
+
+class CacheGeneration(db.Model):
+    """Shared counter per cached result; bumping it invalidates every worker's copy."""
+
+    __tablename__ = "cache_generation"
+    name = db.Column(db.String(50), primary_key=True)
+    generation = db.Column(db.Integer, nullable=False, default=0)
+
+    def __init__(self, name, generation=0):
+        self.name = name
+        self.generation = generation
+
+    def __repr__(self):
+        return f"[Cache {self.name} Generation={self.generation}]"
+
+    @staticmethod
+    def current(name):
+        """Returns the stored generation for name (0 if it was never bumped)."""
+        generation = db.session.scalar(
+            db.select(CacheGeneration.generation).where(CacheGeneration.name == name)
+        )
+        return generation or 0
+
+    @staticmethod
+    def bump(session, name):
+        """Stages an increment of name's generation in the session's current transaction."""
+        with session.no_autoflush:
+            row = session.get(CacheGeneration, name)
+        if row is None:
+            session.add(CacheGeneration(name, 1))
+        else:
+            row.generation = CacheGeneration.generation + 1
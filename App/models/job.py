@@ -0,0 +1,52 @@
+from datetime import datetime
+
+from App.database import db
+
+class Job(db.Model):
+    """A unit of background work drained by `flask worker`.
+
+    While a job is queued, enqueueing another job with the same kind and key is a
+    no-op, so repeated approvals for one student become a single accolade check.
+    """
+
+    __tablename__ = "job"
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    key = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.JSON, nullable=False, default=dict)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.String(255), nullable=True)
+    worker = db.Column(db.String(50), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        # Workers take the oldest queued jobs; enqueue looks for a queued duplicate
+        db.Index('ix_job_status_id', status, id),
+        db.Index('ix_job_kind_key_status', kind, key, status),
+    )
+
+    def __init__(self, kind, key, payload=None):
+        self.kind = kind
+        self.key = str(key)
+        self.payload = payload or {}
+        self.status = 'queued'
+        self.attempts = 0
+        self.created_at = datetime.utcnow()
+
+    def __repr__(self):
+        return f"[Job ID={self.id} Kind={self.kind} Key={self.key} Status={self.status} Attempts={self.attempts}]"
+
+    def get_json(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'key': self.key,
+            'status': self.status,
+            'attempts': self.attempts,
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
@@ -0,0 +1,35 @@
+from App.database import db
+
+# Tiers created with the table. Ids are left to the database so PostgreSQL's serial
+# sequence stays in step; legacy accolades are matched to tiers by name
+DEFAULT_MILESTONES = [
+    {'name': '10 Hours Milestone', 'hours': 10},
+    {'name': '25 Hours Milestone', 'hours': 25},
+    {'name': '50 Hours Milestone', 'hours': 50},
+]
+
+class Milestone(db.Model):
+    """An accolade tier awarded once a student's approved hours reach `hours`."""
+
+    __tablename__ = "milestone"
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False, unique=True)
+    hours = db.Column(db.Float, nullable=False)
+
+    def __init__(self, name, hours):
+        self.name = name
+        self.hours = hours
+
+    def __repr__(self):
+        return f"[Milestone ID={self.id} Name={self.name} Hours={self.hours}]"
+
+    def get_json(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'hours': self.hours
+        }
+
+@db.event.listens_for(Milestone.__table__, 'after_create')
+def seed_default_milestones(target, connection, **kw):
+    connection.execute(target.insert(), DEFAULT_MILESTONES)
@@ -7,6 +7,19 @@ class Request(db.Model):
     hours = db.Column(db.Float, nullable=False)
     status = db.Column(db.String(20), nullable=False, default='pending')
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    # Review lease: the staff member working on this request and until when (UTC)
+    claimed_by = db.Column(db.Integer, db.ForeignKey('staff.staff_id'), nullable=True)
+    claimed_until = db.Column(db.DateTime, nullable=True)
+    # Bumped on every UPDATE; a flush whose WHERE version=? matches no row raises StaleDataError
+    version = db.Column(db.Integer, nullable=False, default=1)
+
+    # The staff queue filters on status and pages through it oldest first
+    __table_args__ = (
+        db.Index('ix_request_status_timestamp', status, timestamp),
+    )
+    __mapper_args__ = {
+        "version_id_col": version
+    }
 
     def __init__(self, student_id, hours, status='pending'):
         self.student_id = student_id
@@ -14,6 +27,12 @@ class Request(db.Model):
         self.status = status
 
     
+    def is_claimed_by_other(self, staff_id, now=None):
+        """True while another staff member holds an unexpired lease on this request."""
+        now = now or datetime.utcnow()
+        return (self.claimed_by is not None and self.claimed_by != staff_id
+                and self.claimed_until is not None and self.claimed_until > now)
+
     def __repr__(self):
         return f"**RequestID={str(self.id):<5} StudentID={self.student_id:<5} Requested Hours={self.hours:<10} Status={self.status:<5}**"
 
@@ -9,6 +9,12 @@ class Student(User):
     #relationship to LoggedHours and Request both One-to-Many
     loggedhours = db.relationship('LoggedHours', backref='student', lazy=True, cascade="all, delete-orphan")
     requests = db.relationship('Request', backref='student', lazy=True, cascade="all, delete-orphan")
+    #One-to-One running totals row, maintained on every LoggedHours/Request write
+    hours_summary = db.relationship('StudentHoursSummary', uselist=False, lazy=True, cascade="all, delete-orphan")
+    #One-to-Many approved hours per day, used by the weekly/monthly leaderboards
+    daily_hours = db.relationship('StudentDailyHours', lazy=True, cascade="all, delete-orphan")
+    #One-to-Many awarded milestones
+    accolades = db.relationship('StudentAccolade', lazy=True, cascade="all, delete-orphan")
 
     #Inheritance setup
     __mapper_args__ = {
@@ -37,6 +43,9 @@ class Student(User):
     
     # This method calculates total approved hours
     def get_total_approved_hours(self):
+        # Read the maintained summary row instead of loading every logged hours entry.
+        if self.hours_summary is not None:
+            return self.hours_summary.approved_hours
         # Only count approved logged hours.
         return sum(lh.hours for lh in self.loggedhours if lh.status == 'approved')
 
@@ -0,0 +1,41 @@
+from datetime import datetime
+
+from App.database import db
+
+class StudentAccolade(db.Model):
+    """One awarded milestone per student; the source of truth for accolades."""
+
+    __tablename__ = "student_accolade"
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('student.student_id'), nullable=False)
+    milestone_id = db.Column(db.Integer, db.ForeignKey('milestone.id'), nullable=False)
+    awarded_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    staff_id = db.Column(db.Integer, db.ForeignKey('staff.staff_id'), nullable=True)
+
+    milestone = db.relationship('Milestone', lazy='joined')
+
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'milestone_id', name='uq_student_accolade_milestone'),
+    )
+
+    def __init__(self, student_id, milestone_id, staff_id=None, awarded_at=None):
+        self.student_id = student_id
+        self.milestone_id = milestone_id
+        self.staff_id = staff_id
+        self.awarded_at = awarded_at or datetime.utcnow()
+
+    def __repr__(self):
+        return f"[Accolade StudentID={self.student_id} MilestoneID={self.milestone_id} Awarded={self.awarded_at} StaffID={self.staff_id}]"
+
+    @property
+    def name(self):
+        return self.milestone.name
+
+    def get_json(self):
+        return {
+            'student_id': self.student_id,
+            'milestone_id': self.milestone_id,
+            'name': self.name,
+            'awarded_at': self.awarded_at.isoformat(),
+            'staff_id': self.staff_id
+        }
@@ -0,0 +1,91 @@
+from collections import defaultdict
+from datetime import datetime
+
+from App.database import db
+from .student import Student
+from .loggedhours import LoggedHours
+
+class StudentDailyHours(db.Model):
+    """Approved hours per student per (UTC) day, summed by the windowed leaderboards."""
+
+    __tablename__ = "student_daily_hours"
+    student_id = db.Column(db.Integer, db.ForeignKey('student.student_id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    approved_hours = db.Column(db.Float, nullable=False, default=0.0)
+
+    # Window queries select a day range first, then group by student
+    __table_args__ = (
+        db.Index('ix_student_daily_hours_day', day, student_id),
+    )
+
+    def __init__(self, student_id, day, approved_hours=0.0):
+        self.student_id = student_id
+        self.day = day
+        self.approved_hours = approved_hours
+
+    def __repr__(self):
+        return f"[Daily Hours StudentID={self.student_id} Day={self.day} Approved={self.approved_hours}]"
+
+    def get_json(self):
+        return {
+            'student_id': self.student_id,
+            'day': self.day.isoformat(),
+            'approved_hours': self.approved_hours
+        }
+
+
+def _stored_bucket(session, log):
+    """Returns the (student_id, day, approved hours) this log currently contributes in the database."""
+    state = db.inspect(log)
+    if any(state.attrs[attr].history.added and not state.attrs[attr].history.deleted
+           for attr in ('student_id', 'status', 'hours', 'timestamp')):
+        # Assigned while expired, so read the stored row rather than trusting history
+        table = LoggedHours.__table__
+        student_id, status, hours, timestamp = session.execute(
+            db.select(table.c.student_id, table.c.status, table.c.hours, table.c.timestamp)
+            .where(table.c.id == log.id)
+        ).one()
+    else:
+        student_id, status, hours, timestamp = (
+            state.attrs[attr].history.deleted[0] if state.attrs[attr].history.deleted else getattr(log, attr)
+            for attr in ('student_id', 'status', 'hours', 'timestamp')
+        )
+    return student_id, timestamp.date(), hours if status == 'approved' else 0.0
+
+@db.event.listens_for(db.session, 'before_flush')
+def update_daily_hours(session, flush_context, instances):
+    """Adds or removes approved LoggedHours in their day bucket within the same flush."""
+    deltas = defaultdict(float)
+    removed_students = {obj.student_id for obj in session.deleted if isinstance(obj, Student)}
+
+    for obj in session.new:
+        if isinstance(obj, LoggedHours) and obj.student_id is not None:
+            if obj.timestamp is None:
+                # Fix the timestamp now so the row and its bucket agree on the day
+                obj.timestamp = datetime.utcnow()
+            if obj.status == 'approved':
+                deltas[(obj.student_id, obj.timestamp.date())] += obj.hours
+
+    for obj in session.deleted:
+        if isinstance(obj, LoggedHours):
+            student_id, day, hours = _stored_bucket(session, obj)
+            deltas[(student_id, day)] -= hours
+
+    for obj in session.dirty:
+        if isinstance(obj, LoggedHours) and session.is_modified(obj):
+            student_id, day, hours = _stored_bucket(session, obj)
+            deltas[(student_id, day)] -= hours
+            if obj.status == 'approved':
+                deltas[(obj.student_id, obj.timestamp.date())] += obj.hours
+
+    with session.no_autoflush:
+        for (student_id, day), amount in deltas.items():
+            if not amount or student_id in removed_students:
+                continue
+            bucket = session.get(StudentDailyHours, (student_id, day))
+            if bucket is None:
+                # A removal from a missing bucket means the day was never backfilled
+                if amount > 0:
+                    session.add(StudentDailyHours(student_id, day, amount))
+            else:
+                bucket.approved_hours = StudentDailyHours.approved_hours + amount
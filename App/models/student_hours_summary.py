@@ -0,0 +1,158 @@
+from collections import defaultdict
+from datetime import datetime
+
+from App.database import db
+from .student import Student
+from .request import Request
+from .loggedhours import LoggedHours
+from .cache_generation import CacheGeneration
+
+class StudentHoursSummary(db.Model):
+    """Running per-student totals, kept in step with LoggedHours and Request writes."""
+
+    __tablename__ = "student_hours_summary"
+    student_id = db.Column(db.Integer, db.ForeignKey('student.student_id'), primary_key=True)
+    approved_hours = db.Column(db.Float, nullable=False, default=0.0)
+    pending_hours = db.Column(db.Float, nullable=False, default=0.0)
+    request_count = db.Column(db.Integer, nullable=False, default=0)
+    last_activity = db.Column(db.DateTime, nullable=True)
+
+    # Serves leaderboard ordering, keyset pages and rank counts without sorting every student
+    __table_args__ = (
+        db.Index('ix_student_hours_summary_rank', approved_hours.desc(), student_id),
+    )
+
+    def __init__(self, student_id, approved_hours=0.0, pending_hours=0.0, request_count=0, last_activity=None):
+        self.student_id = student_id
+        self.approved_hours = approved_hours
+        self.pending_hours = pending_hours
+        self.request_count = request_count
+        self.last_activity = last_activity
+
+    def __repr__(self):
+        return f"[Summary StudentID={self.student_id} Approved={self.approved_hours} Pending={self.pending_hours} Requests={self.request_count}]"
+
+    def get_json(self):
+        return {
+            'student_id': self.student_id,
+            'approved_hours': self.approved_hours,
+            'pending_hours': self.pending_hours,
+            'request_count': self.request_count,
+            'last_activity': self.last_activity.isoformat() if self.last_activity else None
+        }
+
+    @staticmethod
+    def compute(student_id):
+        """Recomputes a student's totals from the LoggedHours and Request tables."""
+        approved = db.session.scalar(
+            db.select(db.func.coalesce(db.func.sum(LoggedHours.hours), 0.0))
+            .where(LoggedHours.student_id == student_id, LoggedHours.status == 'approved')
+        )
+        pending, count, last_request = db.session.execute(
+            db.select(
+                db.func.coalesce(db.func.sum(db.case((Request.status == 'pending', Request.hours), else_=0.0)), 0.0),
+                db.func.count(Request.id),
+                db.func.max(Request.timestamp)
+            ).where(Request.student_id == student_id)
+        ).one()
+        last_log = db.session.scalar(
+            db.select(db.func.max(LoggedHours.timestamp)).where(LoggedHours.student_id == student_id)
+        )
+        stamps = [t for t in (last_request, last_log) if t is not None]
+        return {
+            'approved_hours': approved,
+            'pending_hours': pending,
+            'request_count': count,
+            'last_activity': max(stamps) if stamps else None
+        }
+
+
+# Each tracked row contributes these amounts to its student's summary
+def _contribution(obj, status, hours):
+    if isinstance(obj, LoggedHours):
+        return {'approved_hours': hours if status == 'approved' else 0.0}
+    return {
+        'pending_hours': hours if status == 'pending' else 0.0,
+        'request_count': 1
+    }
+
+def _stored_values(session, obj):
+    """Returns the row's (student_id, status, hours) as they currently stand in the database."""
+    state = db.inspect(obj)
+    values = []
+    for attr in ('student_id', 'status', 'hours'):
+        history = state.attrs[attr].history
+        if history.deleted:
+            values.append(history.deleted[0])
+        elif history.unchanged:
+            values.append(history.unchanged[0])
+        elif not history.added:
+            values.append(getattr(obj, attr))
+        else:
+            # Assigned while expired, so the old value was never loaded
+            table = obj.__table__
+            return tuple(session.execute(
+                db.select(table.c.student_id, table.c.status, table.c.hours).where(table.c.id == obj.id)
+            ).one())
+    return tuple(values)
+
+def _add(deltas, student_id, contribution, sign):
+    if student_id is None:
+        return
+    for column, amount in contribution.items():
+        deltas[student_id][column] += sign * amount
+
+@db.event.listens_for(db.session, 'before_flush')
+def update_hours_summaries(session, flush_context, instances):
+    """Folds pending LoggedHours/Request changes into the summary rows within the same flush.
+
+    Also bumps the 'leaderboard' cache generation whenever the ranking could change.
+    """
+    deltas = defaultdict(lambda: defaultdict(int))
+    removed_students = {obj.student_id for obj in session.deleted if isinstance(obj, Student)}
+
+    for obj in session.new:
+        if isinstance(obj, Student) and obj.hours_summary is None:
+            # Every student gets a row so leaderboard reads can drive from the summary index
+            obj.hours_summary = StudentHoursSummary(obj.student_id)
+        elif isinstance(obj, (LoggedHours, Request)):
+            _add(deltas, obj.student_id, _contribution(obj, obj.status, obj.hours), 1)
+
+    for obj in session.deleted:
+        if isinstance(obj, (LoggedHours, Request)):
+            student_id, status, hours = _stored_values(session, obj)
+            _add(deltas, student_id, _contribution(obj, status, hours), -1)
+
+    for obj in session.dirty:
+        if isinstance(obj, (LoggedHours, Request)) and session.is_modified(obj):
+            student_id, status, hours = _stored_values(session, obj)
+            _add(deltas, student_id, _contribution(obj, status, hours), -1)
+            _add(deltas, obj.student_id, _contribution(obj, obj.status, obj.hours), 1)
+
+    # Rankings change when approved totals move or students join, leave or are renamed
+    if (any(changes.get('approved_hours') for changes in deltas.values())
+            or any(isinstance(obj, Student) for obj in session.new)
+            or removed_students
+            or any(isinstance(obj, Student) and db.inspect(obj).attrs.username.history.has_changes()
+                   for obj in session.dirty)):
+        CacheGeneration.bump(session, 'leaderboard')
+
+    now = datetime.utcnow()
+    with session.no_autoflush:
+        for student_id, changes in deltas.items():
+            changes = {column: amount for column, amount in changes.items() if amount}
+            if not changes or student_id in removed_students:
+                continue
+            summary = session.get(StudentHoursSummary, student_id)
+            if summary is None:
+                # First write for this student: start from the stored rows, then apply this flush
+                totals = StudentHoursSummary.compute(student_id)
+                for column, amount in changes.items():
+                    totals[column] += amount
+                totals['last_activity'] = now
+                session.add(StudentHoursSummary(student_id, **totals))
+                continue
+            for column, amount in changes.items():
+                # Relative SQL update so concurrent workers do not overwrite each other
+                setattr(summary, column, getattr(StudentHoursSummary, column) + amount)
+            summary.last_activity = now
@@ -1,5 +1,5 @@
-from werkzeug.security import check_password_hash, generate_password_hash
 from App.database import db
+from App.passwords import hash_password, verify_password, needs_rehash
 
 class User(db.Model):
     __tablename__ = "users"
@@ -14,6 +14,12 @@ class User(db.Model):
         "polymorphic_identity": "user"
     }
 
+    # Usernames and emails are unique ignoring case; registration checks both with one lookup
+    __table_args__ = (
+        db.Index('uq_users_username_lower', db.func.lower(username), unique=True),
+        db.Index('uq_users_email_lower', db.func.lower(email), unique=True),
+    )
+
     def __init__(self, username, email,password,role):
         self.username = username
         self.role=role
@@ -29,11 +35,15 @@ class User(db.Model):
 
     def set_password(self, password):
         """Create hashed password."""
-        self.password = generate_password_hash(password)
+        self.password = hash_password(password)
     
     def check_password(self, password):
         """Check hashed password."""
-        return check_password_hash(self.password, password)
+        return verify_password(self.password, password)
+
+    def password_needs_rehash(self):
+        """True when the stored hash predates the configured PASSWORD_HASH_METHOD."""
+        return needs_rehash(self.password)
     
 
 
@@ -0,0 +1,69 @@
+import atexit, multiprocessing, threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from flask import current_app, has_app_context
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# Used outside an app context (e.g. scripts building models directly)
+DEFAULT_METHOD = 'scrypt'
+
+_pool = None
+_pool_size = 0
+_pool_lock = threading.Lock()
+
+def _config(key, default):
+    return current_app.config.get(key, default) if has_app_context() else default
+
+def _get_pool():
+    """Returns the shared process pool, or None when PASSWORD_HASH_WORKERS is 0.
+
+    Hashing is CPU-bound and holds up a gevent worker's whole event loop, so it runs
+    in separate processes; waiting on the result only blocks the calling greenlet.
+    The pool is started on first use and resized if the setting changes.
+    """
+    global _pool, _pool_size
+    size = _config('PASSWORD_HASH_WORKERS', 0)
+    if not size:
+        return None
+    with _pool_lock:
+        if _pool is None or _pool_size != size:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # spawn, not fork: children never inherit the app, its connections or the event loop
+            _pool = ProcessPoolExecutor(max_workers=size, mp_context=multiprocessing.get_context('spawn'))
+            _pool_size = size
+        return _pool
+
+def shutdown_hash_pool():
+    """Stops the hashing processes; the next hash starts a new pool if one is configured."""
+    global _pool, _pool_size
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+        _pool, _pool_size = None, 0
+
+atexit.register(shutdown_hash_pool)
+
+def _run(function, *args):
+    pool = _get_pool()
+    if pool is None:
+        return function(*args)
+    return pool.submit(function, *args).result()
+
+def hash_password(password):
+    """Hashes a password with PASSWORD_HASH_METHOD, in the pool when one is configured."""
+    return _run(generate_password_hash, password, _config('PASSWORD_HASH_METHOD', DEFAULT_METHOD))
+
+def verify_password(pwhash, password):
+    """Checks a password against its stored hash, in the pool when one is configured."""
+    return _run(check_password_hash, pwhash, password)
+
+@lru_cache(maxsize=8)
+def _hash_parameters(method):
+    # werkzeug fills in default work factors ("scrypt" -> "scrypt:32768:8:1"); hash once to learn them
+    return generate_password_hash('', method).split('$', 1)[0]
+
+def needs_rehash(pwhash):
+    """True when a stored hash was made with other parameters than PASSWORD_HASH_METHOD."""
+    return pwhash.split('$', 1)[0] != _hash_parameters(_config('PASSWORD_HASH_METHOD', DEFAULT_METHOD))
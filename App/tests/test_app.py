@@ -1,9 +1,11 @@
-import os, tempfile, pytest, logging, unittest
+import os, tempfile, time, pytest, logging, unittest
+from flask import current_app
+from datetime import date, datetime, timedelta
 from werkzeug.security import check_password_hash, generate_password_hash
 
 from App.main import create_app
 from App.database import db, create_db
-from App.models import User, Student, Request, Staff, LoggedHours, ActivityHistory
+from App.models import User, Student, Request, Staff, LoggedHours, ActivityHistory, ActivityHistoryArchive, StudentHoursSummary, StudentDailyHours, StudentAccolade, Job
 
 from App.controllers import (
     create_user,
@@ -26,8 +28,33 @@ from App.controllers.staff_controller import (
     register_staff,
     fetch_all_requests,
     process_request_approval,
-    process_request_denial
+    process_request_denial,
+    process_batch_review
 )
+from App.controllers.leaderboard import (
+    get_leaderboard,
+    get_leaderboard_cache,
+    get_leaderboard_page,
+    get_student_rank,
+    get_window_range,
+    get_window_leaderboard
+)
+from App.controllers.unit_of_work import UnitOfWork, ConcurrentUpdateError
+from App.controllers.loader import Loader
+from App.controllers import jobs as job_queue
+from App.controllers.jobs import run_pending_jobs, queue_stats, enqueue_job
+from App.controllers.history import get_history_page, archive_history, hours_approved_by_staff, requests_per_day
+from App.controllers.activity_log import ActivityLog, flush_activity_log
+from App.commands.AccoladeCommand import AccoladeCommand
+from App.passwords import shutdown_hash_pool
+from App.controllers.auth import Principal, PrincipalCache
+from App.controllers.user import DuplicateUserError, find_duplicate_user
+from sqlalchemy.exc import IntegrityError
+from App.controllers.request_queue import fetch_pending_requests, claim_requests
+from App.commands.DenyRequestCommand import DenyRequestCommand
+from App.controllers.hours_summary import rebuild_hours_summaries, check_hours_summaries, rebuild_daily_hours
+from App.controllers.accolades import backfill_student_accolades, recompute_accolades
+from App.controllers.milestones import MilestoneTiers, Tier, add_milestone, remove_milestone, get_all_milestones
 
 LOGGER = logging.getLogger(__name__)
 
@@ -136,6 +163,27 @@ class LoggedHoursUnitTests(unittest.TestCase):
         self.assertIn("2", rep)
         self.assertIn("20", rep)
 
+class PrincipalCacheUnitTests(unittest.TestCase):
+
+    def test_principal_cache_lru_and_invalidation(self):
+        cache = PrincipalCache(ttl=60, max_entries=2)
+        for n in (1, 2, 3):
+            cache.put(str(n), 0, Principal(n, 'student', f"user{n}", student_id=n))
+        assert cache.get('1', 0) is None  # evicted
+        assert cache.get('3', 0).username == "user3"
+
+        # A user changed in some worker: every principal from the old generation is stale
+        assert cache.get('3', 1) is None
+        assert cache.get('2', 1) is None
+
+    def test_principal_cache_ttl(self):
+        cache = PrincipalCache(ttl=0.01, max_entries=10)
+        cache.put('1', 0, Principal(1, 'staff', "someone", staff_id=1))
+        assert cache.get('1', 0) is not None
+        time.sleep(0.02)
+        assert cache.get('1', 0) is None
+        assert cache.stats()['hits'] == 1
+
 class ActivityHistoryUnitTests(unittest.TestCase):
 
     def test_init_activityhistory(self):
@@ -159,6 +207,20 @@ class ActivityHistoryUnitTests(unittest.TestCase):
         self.assertIn("1", rep)
         self.assertIn("2", rep)
 
+class MilestoneTiersUnitTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tiers = MilestoneTiers([Tier(3, "Gold", 50), Tier(1, "Bronze", 10), Tier(2, "Silver", 25)])
+
+    def test_reached(self):
+        assert [t.name for t in self.tiers.reached(9.5)] == []
+        assert [t.name for t in self.tiers.reached(25)] == ["Bronze", "Silver"]
+        assert [t.name for t in self.tiers.reached(80)] == ["Bronze", "Silver", "Gold"]
+
+    def test_crossed(self):
+        assert [t.name for t in self.tiers.crossed(8, 12)] == ["Bronze"]
+        assert [t.name for t in self.tiers.crossed(10, 24)] == []
+        assert [t.name for t in self.tiers.crossed(20, 60)] == ["Silver", "Gold"]
 
 
     
@@ -228,6 +290,355 @@ class StaffIntegrationTests(unittest.TestCase):
         assert result['denial_successful'] in [True, (True, 'Request denied successfully.')]
         assert result['request'].status == 'denied'
 
+    def test_approval_commits_once(self):
+        staff = register_staff("obi", "obi@example.com", "staffpass")
+        student = Student.create_student("chukwuma", "chukwuma@example.com", "studpass")
+        req = create_hours_request(student.student_id, 12.0)
+
+        commits = []
+        count_commit = lambda session: commits.append(session)
+        db.event.listen(db.session, 'after_commit', count_commit)
+        try:
+            process_request_approval(staff.staff_id, req.id)
+        finally:
+            db.event.remove(db.session, 'after_commit', count_commit)
+
+        assert len(commits) == 1
+        # The approval, its log entry and the accolade all landed in that commit
+        assert fetch_accolades(student.student_id) == ['10 Hours Milestone']
+        assert ActivityHistory.query.filter_by(student_id=student.student_id, command_type='LogHoursCommand').count() == 1
+
+    def test_unit_of_work_rolls_back_on_error(self):
+        staff = register_staff("zainab", "zainab@example.com", "staffpass")
+        student = Student.create_student("halima", "halima@example.com", "studpass")
+        req = create_hours_request(student.student_id, 2.0)
+
+        with pytest.raises(RuntimeError):
+            with UnitOfWork() as uow:
+                uow.run(DenyRequestCommand(req, staff), flush=True)
+                with UnitOfWork():
+                    pass  # a nested unit of work must not commit early
+                raise RuntimeError("fail after staging")
+
+        assert Request.query.get(req.id).status == 'pending'
+
+    def test_concurrent_approval_conflicts(self):
+        staff = register_staff("versionstaff", "versionstaff@example.com", "staffpass")
+        student = Student.create_student("versionstudent", "versionstudent@example.com", "studpass")
+        req = create_hours_request(student.student_id, 3.0)
+        assert req.version == 1
+
+        # Another worker writes the request after this session has read it
+        with db.engine.begin() as connection:
+            connection.execute(
+                db.text("UPDATE request SET version = version + 1 WHERE id = :id"),
+                {'id': req.id}
+            )
+        with pytest.raises(ConcurrentUpdateError):
+            process_request_approval(staff.staff_id, req.id)
+
+        # The losing approval rolled back entirely, so no hours were logged
+        assert LoggedHours.query.filter_by(student_id=student.student_id).count() == 0
+        assert Request.query.get(req.id).version == 2
+        assert Request.query.get(req.id).status == 'pending'
+
+    def test_batch_review_single_transaction(self):
+        staff = register_staff("adeyemi", "adeyemi@example.com", "staffpass")
+        student = Student.create_student("kemi", "kemi@example.com", "studpass")
+        first = create_hours_request(student.student_id, 6.0)
+        second = create_hours_request(student.student_id, 5.0)
+        denied = create_hours_request(student.student_id, 1.0)
+
+        commits = []
+        count_commit = lambda session: commits.append(session)
+        db.event.listen(db.session, 'after_commit', count_commit)
+        try:
+            summary = process_batch_review(staff.staff_id, [
+                {'request_id': first.id, 'action': 'approve'},
+                {'request_id': second.id, 'action': 'approve'},
+                {'request_id': denied.id, 'action': 'deny'},
+                {'request_id': first.id, 'action': 'approve'},
+                {'request_id': 999999, 'action': 'deny'},
+            ])
+        finally:
+            db.event.remove(db.session, 'after_commit', count_commit)
+
+        assert len(commits) == 1
+        assert [r['status'] for r in summary['results']] == ['approved', 'approved', 'denied', 'not_pending', 'not_found']
+        assert (summary['approved'], summary['denied'], summary['failed']) == (2, 1, 2)
+        assert student.get_total_approved_hours() == 11.0
+        # Both approvals together cross the first tier, which is awarded once
+        assert summary['accolades'] == [{'student_id': student.student_id, 'accolades': ['10 Hours Milestone']}]
+        assert fetch_accolades(student.student_id) == ['10 Hours Milestone']
+
+    def test_batch_review_rejects_malformed_items(self):
+        staff = register_staff("ifeoma", "ifeoma@example.com", "staffpass")
+        for items in ([], [{'request_id': 1, 'action': 'archive'}], [{'action': 'approve'}]):
+            with pytest.raises(ValueError):
+                process_batch_review(staff.staff_id, items)
+
+    def test_loader_batches_lookups(self):
+        staff = register_staff("loaderstaff", "loaderstaff@example.com", "staffpass")
+        first = Student.create_student("loaderone", "loaderone@example.com", "studpass")
+        second = Student.create_student("loadertwo", "loadertwo@example.com", "studpass")
+
+        loader = Loader()
+        found = loader.get_many(Student, [first.student_id, second.student_id, 999999])
+        assert found == {first.student_id: first, second.student_id: second}
+        assert loader.get(Student, first.student_id) is first
+        assert loader.get(Student, second.student_id) is second
+        assert loader.get(Student, 999999) is None
+        # A staff id is not a student, even though both share the users table
+        assert loader.get(Student, staff.staff_id) is None
+        assert loader.get(Staff, staff.staff_id) is staff
+        assert loader.stats() == {'lookups': 8, 'queries': 3, 'saved': 5}
+
+        db.session.delete(second)
+        db.session.commit()
+        assert loader.get(Student, second.student_id) is None
+
+    def test_pending_queue_pages_and_filters(self):
+        student = Student.create_student("queuestudent", "queuestudent@example.com", "studpass")
+        other = Student.create_student("queueother", "queueother@example.com", "studpass")
+        base = datetime(2024, 3, 1, 9, 0)
+        requests = []
+        for n, hours in enumerate([1.0, 2.0, 3.0, 4.0, 5.0]):
+            req = Request(student_id=student.student_id, hours=hours)
+            req.timestamp = base + timedelta(days=n)
+            requests.append(req)
+        # Same timestamp as the third request, so the id breaks the tie
+        twin = Request(student_id=other.student_id, hours=6.0)
+        twin.timestamp = base + timedelta(days=2)
+        db.session.add_all(requests + [twin])
+        db.session.commit()
+
+        pages, after = [], None
+        while True:
+            rows, after = fetch_pending_requests(2, after=after, student_id=None,
+                                                 start=base.date(), end=(base + timedelta(days=4)).date())
+            pages.extend(row['id'] for row in rows)
+            if after is None:
+                break
+        expected = [requests[0].id, requests[1].id, requests[2].id, twin.id, requests[3].id, requests[4].id]
+        assert pages == expected
+
+        rows, _ = fetch_pending_requests(10, student_id=student.student_id, min_hours=2.0, max_hours=4.0,
+                                         start=base.date(), end=(base + timedelta(days=2)).date())
+        assert [(row['student_name'], row['hours']) for row in rows] == [('queuestudent', 2.0), ('queuestudent', 3.0)]
+
+        with pytest.raises(ValueError):
+            fetch_pending_requests(10, after='not-a-cursor')
+
+    def test_claims_do_not_overlap_and_expire(self):
+        first_staff = register_staff("leasefirst", "leasefirst@example.com", "staffpass")
+        second_staff = register_staff("leasesecond", "leasesecond@example.com", "staffpass")
+        student = Student.create_student("leasestudent", "leasestudent@example.com", "studpass")
+        mine = {create_hours_request(student.student_id, hours).id for hours in (1.0, 2.0, 3.0)}
+        try:
+            first, claimed_until = claim_requests(first_staff.staff_id, 1000)
+            # Stored without microseconds, which MySQL DATETIME columns would drop
+            assert claimed_until.microsecond == 0
+            second, _ = claim_requests(second_staff.staff_id, 1000)
+            first_ids = {row['id'] for row in first}
+            assert mine <= first_ids
+            assert not first_ids & {row['id'] for row in second}
+
+            # The second staff member cannot review a request leased to the first
+            leased = min(mine)
+            result = process_request_denial(second_staff.staff_id, leased)
+            assert result['request'].status == 'pending'
+
+            # Once the lease expires the request can be claimed again
+            db.session.execute(db.update(Request).where(Request.id == leased)
+                               .values(claimed_until=datetime.utcnow() - timedelta(seconds=1)))
+            db.session.commit()
+            again, _ = claim_requests(second_staff.staff_id, 1000)
+            assert [row['id'] for row in again] == [leased]
+            assert process_request_denial(second_staff.staff_id, leased)['request'].status == 'denied'
+        finally:
+            # Leases would otherwise block the other tests' reviews
+            db.session.execute(db.update(Request).values(claimed_by=None, claimed_until=None))
+            db.session.commit()
+
+    def test_accolade_checks_run_in_worker(self):
+        app = current_app
+        staff = register_staff("jobstaff", "jobstaff@example.com", "staffpass")
+        student = Student.create_student("jobstudent", "jobstudent@example.com", "studpass")
+        requests = [create_hours_request(student.student_id, hours) for hours in (6.0, 6.0)]
+        app.config['ACCOLADE_JOBS_ENABLED'] = True
+        try:
+            for req in requests:
+                process_request_approval(staff.staff_id, req.id)
+        finally:
+            app.config['ACCOLADE_JOBS_ENABLED'] = False
+
+        # Nothing awarded on the request path, and both approvals share one queued job
+        assert fetch_accolades(student.student_id) == []
+        queued = Job.query.filter_by(key=str(student.student_id), status='queued').all()
+        assert len(queued) == 1
+        assert queue_stats()['queued'] >= 1
+
+        counts = run_pending_jobs()
+        assert counts['done'] >= 1 and counts['failed'] == 0
+        assert fetch_accolades(student.student_id) == ['10 Hours Milestone']
+        assert db.session.get(Job, queued[0].id).status == 'done'
+
+    def test_failing_job_is_retried_then_failed(self):
+        def explode(jobs):
+            raise RuntimeError("boom")
+
+        job_queue.JOB_HANDLERS['explode'] = explode
+        try:
+            job = enqueue_job('explode', 'only')
+            db.session.commit()
+            for _ in range(current_app.config['JOB_MAX_ATTEMPTS']):
+                run_pending_jobs()
+        finally:
+            del job_queue.JOB_HANDLERS['explode']
+
+        job = db.session.get(Job, job.id)
+        assert job.status == 'failed'
+        assert job.error == 'boom'
+
+    def test_buffered_activity_log(self):
+        staff = register_staff("bufferstaff", "bufferstaff@example.com", "staffpass")
+        student = Student.create_student("bufferstudent", "bufferstudent@example.com", "studpass")
+        req = create_hours_request(student.student_id, 11.0)
+        current_app.config['ACTIVITY_LOG_MODE'] = 'worker'
+        try:
+            process_request_approval(staff.staff_id, req.id)
+
+            def logged(command_type):
+                return ActivityHistory.query.filter_by(student_id=student.student_id, command_type=command_type).count()
+
+            # The approval itself is audit-critical and committed with the action
+            assert logged('LogHoursCommand') == 1
+            assert logged('AccoladeCommand') == 0
+            assert flush_activity_log(force=True) == 1
+            assert logged('AccoladeCommand') == 1
+        finally:
+            current_app.config['ACTIVITY_LOG_MODE'] = 'sync'
+            current_app.extensions.pop('activity_log_buffer', None)
+
+    def test_buffered_entries_from_rolled_back_batch_are_dropped(self):
+        app = current_app
+        staff = register_staff("retrystaff", "retrystaff@example.com", "staffpass")
+        students = [Student.create_student(f"retrystudent{n}", f"retrystudent{n}@example.com", "studpass")
+                    for n in range(2)]
+        app.config['ACCOLADE_JOBS_ENABLED'] = True
+        try:
+            for student in students:
+                process_request_approval(staff.staff_id, create_hours_request(student.student_id, 11.0).id)
+        finally:
+            app.config['ACCOLADE_JOBS_ENABLED'] = False
+
+        check_accolades = job_queue.JOB_HANDLERS[job_queue.ACCOLADE_CHECK]
+
+        def fail_batches(jobs):
+            # Stages the awards and their log entries, then fails so the batch rolls back
+            check_accolades(jobs)
+            if len(jobs) > 1:
+                raise RuntimeError("batch failed")
+
+        job_queue.JOB_HANDLERS[job_queue.ACCOLADE_CHECK] = fail_batches
+        app.config['ACTIVITY_LOG_MODE'] = 'worker'
+        try:
+            counts = run_pending_jobs()
+            assert counts['failed'] == 0 and counts['retried'] == 0
+            flush_activity_log(force=True)
+        finally:
+            job_queue.JOB_HANDLERS[job_queue.ACCOLADE_CHECK] = check_accolades
+            app.config['ACTIVITY_LOG_MODE'] = 'sync'
+            app.extensions.pop('activity_log_buffer', None)
+
+        # Only the one-by-one retries committed, so each award is logged once
+        for student in students:
+            assert fetch_accolades(student.student_id) == ['10 Hours Milestone']
+            assert ActivityHistory.query.filter_by(student_id=student.student_id,
+                                                   command_type='AccoladeCommand').count() == 1
+
+    def test_long_accolade_description_is_truncated(self):
+        student = Student.create_student("longtiers", "longtiers@example.com", "studpass")
+        command = AccoladeCommand(student)
+        # Three tiers crossed at once, each with a name as long as Milestone.name allows
+        command.accolades_awarded = [f"{n} " + "x" * 98 for n in range(3)]
+        command.milestone_ids = [1, 2, 3]
+        with UnitOfWork():
+            ActivityLog.log_command_execution(command, student.student_id)
+
+        entry = ActivityHistory.query.filter_by(student_id=student.student_id, command_type='AccoladeCommand').one()
+        assert len(entry.description) == 255 and entry.description.endswith('...')
+        # Rendered from the payload, so nothing is lost
+        assert entry.render_description() == command.get_description()
+
+    def test_hours_summary_tracks_approval_and_denial(self):
+        staff = register_staff("okafor", "okafor@example.com", "staffpass")
+        student = Student.create_student("tobi", "tobi@example.com", "studpass")
+        approve = create_hours_request(student.student_id, 4.0)
+        deny = create_hours_request(student.student_id, 1.5)
+
+        summary = db.session.get(StudentHoursSummary, student.student_id)
+        assert summary.pending_hours == 5.5
+        assert summary.request_count == 2
+
+        process_request_approval(staff.staff_id, approve.id)
+        process_request_denial(staff.staff_id, deny.id)
+
+        summary = db.session.get(StudentHoursSummary, student.student_id)
+        assert summary.approved_hours == 4.0
+        assert summary.pending_hours == 0.0
+        assert summary.last_activity is not None
+        assert get_approved_hours(student.student_id) == ("tobi", 4.0)
+
+    def test_hours_summary_tracks_deletes(self):
+        staff = register_staff("achebe", "achebe@example.com", "staffpass")
+        student = Student.create_student("kofi", "kofi@example.com", "studpass")
+        log = LoggedHours(student_id=student.student_id, staff_id=staff.staff_id, hours=9.0, status='approved')
+        req = Request(student_id=student.student_id, hours=2.0, status='pending')
+        db.session.add_all([log, req])
+        db.session.commit()
+
+        db.session.delete(log)
+        db.session.delete(req)
+        db.session.commit()
+
+        summary = db.session.get(StudentHoursSummary, student.student_id)
+        assert summary.approved_hours == 0.0
+        assert summary.pending_hours == 0.0
+        assert summary.request_count == 0
+
+    def test_hours_summary_tracks_status_set_after_commit(self):
+        student = Student.create_student("ada", "ada@example.com", "studpass")
+        req = Request(student_id=student.student_id, hours=6.0, status='pending')
+        db.session.add(req)
+        db.session.commit()
+
+        # the commit expired req, so the old status is never loaded before this write
+        req.status = 'denied'
+        db.session.commit()
+
+        assert db.session.get(StudentHoursSummary, student.student_id).pending_hours == 0.0
+
+    def test_hours_summary_consistency_check(self):
+        assert check_hours_summaries() == []
+        student = Student.create_student("ngozi", "ngozi@example.com", "studpass")
+        create_hours_request(student.student_id, 3.0)
+        db.session.get(StudentHoursSummary, student.student_id).pending_hours = 99.0
+        db.session.commit()
+
+        mismatches = check_hours_summaries()
+        assert {'student_id': student.student_id, 'field': 'pending_hours', 'expected': 3.0, 'actual': 99.0} in mismatches
+
+        # A student without a row would silently drop off the leaderboard
+        other = Student.create_student("ngozirow", "ngozirow@example.com", "studpass")
+        db.session.delete(db.session.get(StudentHoursSummary, other.student_id))
+        db.session.commit()
+        mismatches = check_hours_summaries()
+        assert {'student_id': other.student_id, 'field': 'summary_row', 'expected': 'present', 'actual': 'missing'} in mismatches
+
+        rebuild_hours_summaries()
+        assert check_hours_summaries() == []
+
 
 class StudentIntegrationTests(unittest.TestCase):
 
@@ -237,6 +648,47 @@ class StudentIntegrationTests(unittest.TestCase):
         fetched = Student.query.get(student.student_id)
         assert fetched is not None
 
+    def test_duplicate_accounts_rejected_ignoring_case(self):
+        register_student("CaseStudent", "CaseStudent@example.com", "pass")
+        with pytest.raises(DuplicateUserError):
+            register_student("casestudent", "other@example.com", "pass")
+        with pytest.raises(DuplicateUserError):
+            register_staff("otherstaff", "casestudent@EXAMPLE.com", "pass")
+        assert find_duplicate_user("CASESTUDENT", "nobody@example.com") == 'username'
+
+        # The unique index catches what slips past the check, e.g. a concurrent registration
+        with pytest.raises(IntegrityError):
+            Student.create_student("casestudent", "third@example.com", "pass")
+        db.session.rollback()
+        assert User.query.filter(db.func.lower(User.username) == "casestudent").count() == 1
+
+    def test_login_rehashes_outdated_password(self):
+        config = current_app.config
+        original = config['PASSWORD_HASH_METHOD']
+        try:
+            config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:1000'
+            student = register_student("rehashstudent", "rehashstudent@example.com", "studpass")
+            config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:2000'
+            assert student.password_needs_rehash()
+
+            assert login("rehashstudent", "wrongpass") is None
+            assert student.password.startswith('pbkdf2:sha256:1000$')
+            assert login("rehashstudent", "studpass") is not None
+            assert db.session.get(Student, student.student_id).password.startswith('pbkdf2:sha256:2000$')
+        finally:
+            config['PASSWORD_HASH_METHOD'] = original
+
+    def test_password_hashing_in_process_pool(self):
+        config = current_app.config
+        config['PASSWORD_HASH_WORKERS'] = 1
+        try:
+            student = register_student("poolstudent", "poolstudent@example.com", "studpass")
+            assert student.check_password("studpass")
+            assert not student.check_password("other")
+        finally:
+            config['PASSWORD_HASH_WORKERS'] = 0
+            shutdown_hash_pool()
+
     def test_request_hours_confirmation(self):
         student = Student.create_student("amara", "amara@example.com", "pass")
         req = create_hours_request(student.student_id, 4.0)
@@ -270,6 +722,60 @@ class StudentIntegrationTests(unittest.TestCase):
         # 11 hours should give at least the 10 hours accolade
         assert any('10 Hours Milestone' in item for item in accolades)
 
+    def test_accolades_stored_once_per_milestone(self):
+        student = Student.create_student("femi", "femi@example.com", "pass")
+        staff = register_staff("teststaff7", "teststaff7@example.com", "pass")
+        for hours in (12.0, 3.0):
+            req = create_hours_request(student.student_id, hours)
+            process_request_approval(staff.staff_id, req.id)
+
+        awards = StudentAccolade.query.filter_by(student_id=student.student_id).all()
+        assert [a.name for a in awards] == ['10 Hours Milestone']
+        assert awards[0].staff_id == staff.staff_id
+        assert fetch_accolades(student.student_id) == ['10 Hours Milestone']
+
+    def test_configured_tier_is_awarded(self):
+        add_milestone("Century Milestone", 100)
+        student = Student.create_student("bisi", "bisi@example.com", "pass")
+        staff = register_staff("teststaff8", "teststaff8@example.com", "pass")
+        req = create_hours_request(student.student_id, 120.0)
+        process_request_approval(staff.staff_id, req.id)
+
+        assert fetch_accolades(student.student_id) == [
+            '10 Hours Milestone', '25 Hours Milestone', '50 Hours Milestone', 'Century Milestone'
+        ]
+        century = next(m for m in get_all_milestones() if m.name == "Century Milestone")
+        with pytest.raises(ValueError):
+            remove_milestone(century.id)
+
+    def test_recompute_accolades_awards_missing_tiers(self):
+        student = Student.create_student("lola", "lola@example.com", "pass")
+        staff = register_staff("teststaff9", "teststaff9@example.com", "pass")
+        # written directly, as an import would, so no accolade check runs
+        db.session.add(LoggedHours(student_id=student.student_id, staff_id=staff.staff_id, hours=30.0))
+        db.session.commit()
+        assert fetch_accolades(student.student_id) == []
+
+        progress = []
+        result = recompute_accolades(chunk_size=2, progress=lambda *args: progress.append(args))
+        assert fetch_accolades(student.student_id) == ['10 Hours Milestone', '25 Hours Milestone']
+        assert result['awards'] >= 2
+        assert progress[-1][0] == progress[-1][1] == result['students']
+        history = ActivityHistory.query.filter_by(student_id=student.student_id, command_type='AccoladeCommand').all()
+        assert len(history) == 2
+
+        assert recompute_accolades()['awards'] == 0
+
+    def test_backfill_accolades_from_history(self):
+        student = Student.create_student("sade", "sade@example.com", "pass")
+        db.session.add(ActivityHistory(student.student_id, 'AccoladeCommand',
+                                       'Accolades awarded: 10 Hours Milestone, 25 Hours Milestone.', None))
+        db.session.commit()
+
+        assert backfill_student_accolades() == 2
+        assert fetch_accolades(student.student_id) == ['10 Hours Milestone', '25 Hours Milestone']
+        assert backfill_student_accolades() == 0
+
     def test_generate_leaderboard(self):
         # create three students with varying approved hours
         a = Student.create_student("zara", "zara@example.com", "p")
@@ -291,7 +797,222 @@ class StudentIntegrationTests(unittest.TestCase):
         # assert relative ordering: zara (10) > omar (5) > leon (1)
         assert names.index('zara') < names.index('omar') < names.index('leon')
 
-    
+    def test_leaderboard_limit_offset(self):
+        full = generate_leaderboard()
+        page = generate_leaderboard(limit=2, offset=1)
+        assert page == full[1:3]
+
+    def test_leaderboard_counts_only_approved_hours(self):
+        student = Student.create_student("imani", "imani@example.com", "p")
+        staff = register_staff("teststaff4", "teststaff4@example.com", "pass")
+        db.session.add_all([
+            LoggedHours(student_id=student.student_id, staff_id=staff.staff_id, hours=6.0, status='approved'),
+            LoggedHours(student_id=student.student_id, staff_id=staff.staff_id, hours=40.0, status='pending')
+        ])
+        db.session.commit()
+
+        row = next(r for r in get_leaderboard() if r['student_id'] == student.student_id)
+        assert row['total_hours'] == 6.0
+
+    def test_leaderboard_runs_single_query(self):
+        statements = []
+        def count(*args):
+            statements.append(args[2])
+        db.event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+            get_leaderboard(tie_break='username', use_cache=False)
+        finally:
+            db.event.remove(db.engine, 'before_cursor_execute', count)
+        assert len(statements) == 1
+
+    def test_leaderboard_cache_hit_and_invalidation(self):
+        cache = get_leaderboard_cache()
+        first = get_leaderboard(limit=3)
+        hits = cache.stats()['hits']
+        assert get_leaderboard(limit=3) == first
+        assert cache.stats()['hits'] == hits + 1
+
+        # approving hours bumps the shared generation, so the next read recomputes
+        student = Student.create_student("adaeze", "adaeze@example.com", "p")
+        staff = register_staff("teststaff5", "teststaff5@example.com", "pass")
+        req = create_hours_request(student.student_id, 500.0)
+        process_request_approval(staff.staff_id, req.id)
+
+        top = get_leaderboard(limit=3)
+        assert top[0]['student_id'] == student.student_id
+
+    def test_leaderboard_keyset_pages_match_full_board(self):
+        full = get_leaderboard(use_cache=False)
+        pages, cursor = [], None
+        while True:
+            rows, cursor = get_leaderboard_page(3, cursor, use_cache=False)
+            pages.extend(rows)
+            if not cursor:
+                break
+        assert [r['student_id'] for r in pages] == [r['student_id'] for r in full]
+
+    def test_student_rank_matches_board_position(self):
+        full = get_leaderboard(use_cache=False)
+        for row in full[:5] + full[-2:]:
+            assert get_student_rank(row['student_id'])['rank'] == row['rank']
+        assert get_student_rank(999999) is None
+
+    def test_window_leaderboard_sums_daily_buckets(self):
+        student = Student.create_student("chidi", "chidi@example.com", "p")
+        staff = register_staff("teststaff6", "teststaff6@example.com", "pass")
+        req = create_hours_request(student.student_id, 7.0)
+        process_request_approval(staff.staff_id, req.id)
+
+        today = datetime.utcnow().date()
+        bucket = db.session.get(StudentDailyHours, (student.student_id, today))
+        assert bucket.approved_hours == 7.0
+
+        start, end = get_window_range('week')
+        week = get_window_leaderboard(start, end, use_cache=False)
+        assert any(r['student_id'] == student.student_id and r['total_hours'] == 7.0 for r in week)
+
+        past = today - timedelta(days=400)
+        old = get_window_leaderboard(past, past + timedelta(days=1), use_cache=False)
+        assert all(r['student_id'] != student.student_id for r in old)
+
+    def test_daily_buckets_rebuild_matches_hook(self):
+        before = {(b.student_id, b.day): b.approved_hours for b in StudentDailyHours.query.all()}
+        rebuild_daily_hours()
+        after = {(b.student_id, b.day): b.approved_hours for b in StudentDailyHours.query.all()}
+        assert {k: v for k, v in before.items() if v} == after
+
+    def test_window_range(self):
+        wednesday = date(2024, 5, 15)
+        assert get_window_range('week', today=wednesday) == (date(2024, 5, 13), date(2024, 5, 19))
+        assert get_window_range('month', today=wednesday) == (date(2024, 5, 1), date(2024, 5, 31))
+        with pytest.raises(ValueError):
+            get_window_range('custom', start=wednesday)
+        with pytest.raises(ValueError):
+            get_window_range('fortnight')
+
+    def test_leaderboard_rejects_unknown_tie_break(self):
+        with pytest.raises(ValueError):
+            get_leaderboard(tie_break='shoe_size')
+
+    def test_history_pages_newest_first(self):
+        student = Student.create_student("historypager", "historypager@example.com", "pass")
+        base = datetime(2024, 1, 1, 12, 0)
+        entries = []
+        for n in range(5):
+            command_type = 'RequestCommand' if n % 2 == 0 else 'LogHoursCommand'
+            entry = ActivityHistory(student.student_id, command_type, f"entry {n}", None)
+            # Entries 2 and 3 share a timestamp, so the id orders them
+            entry.timestamp = base + timedelta(minutes=min(n, 2) if n < 4 else 10)
+            entries.append(entry)
+        db.session.add_all(entries)
+        db.session.commit()
+
+        actions, before = [], None
+        while True:
+            page, before = get_history_page(student.student_id, 2, before=before)
+            actions.extend(item['action'] for item in page)
+            if before is None:
+                break
+        assert actions == ['entry 4', 'entry 3', 'entry 2', 'entry 1', 'entry 0']
+
+        requests, _ = get_history_page(student.student_id, 10, command_type='RequestCommand')
+        assert [item['action'] for item in requests] == ['entry 4', 'entry 2', 'entry 0']
+
+    def test_archived_history_reads_through(self):
+        student = Student.create_student("historyarchive", "historyarchive@example.com", "pass")
+        base = datetime(2020, 1, 1, 12, 0)
+        entries = []
+        for n in range(5):
+            entry = ActivityHistory(student.student_id, 'RequestCommand', f"entry {n}", None)
+            # Entries 0-2 are old enough to archive
+            entry.timestamp = base + timedelta(days=n) if n < 3 else datetime.utcnow() - timedelta(minutes=5 - n)
+            entries.append(entry)
+        db.session.add_all(entries)
+        db.session.commit()
+
+        moved = archive_history(timedelta(days=3 * 365), chunk_size=2)
+        assert moved >= 3
+        assert ActivityHistory.query.filter_by(student_id=student.student_id).count() == 2
+        assert ActivityHistoryArchive.query.filter_by(student_id=student.student_id).count() == 3
+
+        actions, before = [], None
+        while True:
+            page, before = get_history_page(student.student_id, 2, before=before)
+            actions.extend(item['action'] for item in page)
+            if before is None:
+                break
+        assert actions == ['entry 4', 'entry 3', 'entry 2', 'entry 1', 'entry 0']
+        assert [item['action'] for item in get_activity_history(student.student_id)] == actions
+
+    def test_archived_history_ids_are_not_reused(self):
+        student = Student.create_student("archiveids", "archiveids@example.com", "pass")
+        old = datetime.utcnow() - timedelta(days=5 * 365)
+
+        def add_entry(description):
+            entry = ActivityHistory(student.student_id, 'RequestCommand', description, None)
+            entry.timestamp = old
+            db.session.add(entry)
+            db.session.commit()
+            return entry.id
+
+        # The newest entries in the table are archived...
+        archived = [add_entry(f"archived {n}") for n in range(2)]
+        assert archive_history(timedelta(days=4 * 365)) >= 2
+        assert ActivityHistory.query.filter(ActivityHistory.id.in_(archived)).count() == 0
+
+        # ...so the next entry must not take one of their ids, and can be archived in turn
+        newest = add_entry("after archive")
+        assert newest > max(archived)
+        assert archive_history(timedelta(days=4 * 365)) == 1
+        assert [row.id for row in ActivityHistoryArchive.query.filter_by(student_id=student.student_id)
+                .order_by(ActivityHistoryArchive.id)] == archived + [newest]
+
+    def test_activity_payloads_feed_sql_aggregates(self):
+        student = Student.create_student("payloadstudent", "payloadstudent@example.com", "pass")
+        staff = register_staff("payloadstaff", "payloadstaff@example.com", "pass")
+        first = create_hours_request(student.student_id, 4.0)
+        create_hours_request(student.student_id, 2.5)
+        process_request_approval(staff.staff_id, first.id)
+
+        entry = ActivityHistory.query.filter_by(student_id=student.student_id, command_type='LogHoursCommand').one()
+        assert entry.payload == {'request_id': first.id, 'hours': 4.0, 'username': 'payloadstudent'}
+        assert entry.get_json()['action'] == f"Approved 4.0 hours for Student payloadstudent (Request {first.id})"
+
+        # Legacy rows without a payload keep their stored description
+        legacy = ActivityHistory(student.student_id, 'LogHoursCommand', "Approved 1 hours (legacy)", staff.staff_id)
+        assert legacy.get_json()['action'] == "Approved 1 hours (legacy)"
+
+        by_staff = {row['staff_id']: row for row in hours_approved_by_staff()}
+        assert by_staff[staff.staff_id]['hours'] == 4.0
+        assert by_staff[staff.staff_id]['approvals'] == 1
+
+        today = requests_per_day(since=datetime.utcnow() - timedelta(days=1))
+        assert sum(day['requests'] for day in today) >= 2
+
+    def test_refused_approvals_add_no_history(self):
+        owner = register_staff("payloadowner", "payloadowner@example.com", "pass")
+        other = register_staff("payloadother", "payloadother@example.com", "pass")
+        student = Student.create_student("payloadleased", "payloadleased@example.com", "pass")
+        req = create_hours_request(student.student_id, 5.0)
+        db.session.execute(db.update(Request).where(Request.id == req.id)
+                           .values(claimed_by=owner.staff_id, claimed_until=datetime.utcnow() + timedelta(minutes=5)))
+        db.session.commit()
+        try:
+            for _ in range(3):
+                process_request_approval(other.staff_id, req.id)
+            process_request_approval(owner.staff_id, req.id)
+            # Approving again once it is no longer pending is refused as well
+            process_request_approval(owner.staff_id, req.id)
+        finally:
+            db.session.execute(db.update(Request).values(claimed_by=None, claimed_until=None))
+            db.session.commit()
+
+        entries = ActivityHistory.query.filter_by(student_id=student.student_id, command_type='LogHoursCommand').all()
+        assert [entry.staff_id for entry in entries] == [owner.staff_id]
+        by_staff = {row['staff_id']: row for row in hours_approved_by_staff()}
+        assert other.staff_id not in by_staff
+        assert (by_staff[owner.staff_id]['hours'], by_staff[owner.staff_id]['approvals']) == (5.0, 1)
+
     def test_get_activity_history(self): 
         student = Student.create_student("xavier", "xavier@example.com", "pass") 
         staff = register_staff("teststaff3", "teststaff3@example.com", "pass")       
@@ -9,7 +9,8 @@ class AdminView(ModelView):
 
     @jwt_required()
     def is_accessible(self):
-        return current_user is not None
+        # Checked against the user row, not only the token, before granting write access to every user
+        return current_user is not None and current_user.user is not None
 
     def inaccessible_callback(self, name, **kwargs):
         # redirect to login page if user doesn't have access
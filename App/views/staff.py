@@ -1,28 +1,47 @@
-from flask import Blueprint, render_template, jsonify, request, send_from_directory, flash, redirect, url_for
+from datetime import date
+from flask import Blueprint, render_template, jsonify, request, send_from_directory, flash, redirect, url_for, current_app, Response, stream_with_context
 from flask_jwt_extended import jwt_required, current_user as jwt_current_user
-from App.models import Student,Request,LoggedHours
+from App.models import Student,Staff,Request,LoggedHours
 from.index import index_views
 from App.controllers.student_controller import get_all_students_json,fetch_accolades,create_hours_request
-from App.controllers.staff_controller import process_request_approval,process_request_denial
+from App.controllers.loader import get_loader
+from App.controllers.unit_of_work import UnitOfWork, ConcurrentUpdateError
+from App.controllers.request_queue import fetch_pending_requests, claim_requests
+from App.controllers.staff_controller import process_request_approval,process_request_denial,process_batch_review
+from App.controllers.export import EXPORT_FORMATS, parse_export_time, export_history, export_logged_hours
 from App import db
 
 staff_views = Blueprint('staff_views', __name__, template_folder='../templates')
 
+def _is_current_staff(user):
+    """Checks the staff row as well as the token's role, for routes that change data.
+
+    The review path loads the same row through the request loader, so this adds no query there.
+    """
+    return user.role == 'staff' and get_loader().get(Staff, user.staff_id) is not None
+
 @staff_views.route('/api/accept_request', methods=['PUT'])
 @jwt_required()
 def accept_request_action():
     user = jwt_current_user
-    if user.role != 'staff':
+    if not _is_current_staff(user):
         return jsonify(message='Access forbidden: Not a staff member'), 403
     data = request.json
     if not data or 'request_id' not in data:
         return jsonify(message='Invalid request data'), 400
     # Logic to accept the request goes here
-    req = Request.query.get(data['request_id'])
+    req = get_loader().get(Request, data['request_id'])
     if not req:
         return jsonify(message='Request not found'), 404
     
-    process_request_approval(user.staff_id, data['request_id'])
+    try:
+        result = process_request_approval(user.staff_id, data['request_id'])
+    except ConcurrentUpdateError:
+        return jsonify(message='Request was changed by another reviewer, reload and try again'), 409
+    if not result['logged_hours']:
+        # Locked while another reviewer holds the lease, otherwise already reviewed
+        status = 423 if req.status == 'pending' and req.is_claimed_by_other(user.staff_id) else 409
+        return jsonify(message=result['message']), status
     
     return jsonify(message='Request accepted'), 200
 
@@ -30,40 +49,112 @@ def accept_request_action():
 @jwt_required()
 def deny_request_action():
     user = jwt_current_user
-    if user.role != 'staff':
+    if not _is_current_staff(user):
         return jsonify(message='Access forbidden: Not a staff member'), 403
     data = request.json
     if not data or 'request_id' not in data:
         return jsonify(message='Invalid request data'), 400    
     # Logic to deny the request goes here
-    req = Request.query.get(data['request_id'])
+    req = get_loader().get(Request, data['request_id'])
     if not req:
         return jsonify(message='Request not found'), 404    
-    process_request_denial(user.staff_id, data['request_id'])
+    try:
+        denied, message = process_request_denial(user.staff_id, data['request_id'])['denial_successful']
+    except ConcurrentUpdateError:
+        return jsonify(message='Request was changed by another reviewer, reload and try again'), 409
+    if not denied:
+        status = 423 if req.status == 'pending' and req.is_claimed_by_other(user.staff_id) else 409
+        return jsonify(message=message), status
     return jsonify(message='Request denied'), 200
 
+@staff_views.route('/api/requests/batch', methods=['PUT'])
+@jwt_required()
+def batch_review_action():
+    user = jwt_current_user
+    if not _is_current_staff(user):
+        return jsonify(message='Access forbidden: Not a staff member'), 403
+    data = request.json
+    # Accept either a bare list of items or {"items": [...]}
+    items = data.get('items') if isinstance(data, dict) else data
+    try:
+        summary = process_batch_review(user.staff_id, items)
+    except ValueError as e:
+        return jsonify(message=str(e)), 400
+    except ConcurrentUpdateError:
+        # The batch is one transaction, so nothing in it was applied
+        return jsonify(message='A request in the batch was changed by another reviewer, reload and try again'), 409
+    return jsonify(summary), 200
+
+@staff_views.route('/api/requests/pending', methods=['GET'])
+@jwt_required()
+def pending_requests_action():
+    user = jwt_current_user
+    if user.role != 'staff':
+        return jsonify(message='Access forbidden: Not a staff member'), 403
+    limit = request.args.get('limit', current_app.config['REQUEST_QUEUE_PAGE_SIZE'], type=int)
+    max_page = current_app.config['REQUEST_QUEUE_MAX_PAGE_SIZE']
+    try:
+        if limit > max_page:
+            raise ValueError(f"limit must be at most {max_page}.")
+        rows, next_cursor = fetch_pending_requests(
+            limit,
+            after=request.args.get('after'),
+            student_id=request.args.get('student_id', type=int),
+            start=date.fromisoformat(request.args['from']) if request.args.get('from') else None,
+            end=date.fromisoformat(request.args['to']) if request.args.get('to') else None,
+            min_hours=request.args.get('min_hours', type=float),
+            max_hours=request.args.get('max_hours', type=float)
+        )
+    except ValueError as e:
+        return jsonify(message=str(e)), 400
+
+    response = jsonify(rows)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+@staff_views.route('/api/requests/claim', methods=['POST'])
+@jwt_required()
+def claim_requests_action():
+    user = jwt_current_user
+    if not _is_current_staff(user):
+        return jsonify(message='Access forbidden: Not a staff member'), 403
+    n = request.args.get('n', 1, type=int)
+    max_claim = current_app.config['REQUEST_CLAIM_MAX']
+    try:
+        if n > max_claim:
+            raise ValueError(f"n must be at most {max_claim}.")
+        rows, claimed_until = claim_requests(user.staff_id, n)
+    except ValueError as e:
+        return jsonify(message=str(e)), 400
+    return jsonify(claimed_until=claimed_until.isoformat(), requests=rows), 200
+
 @staff_views.route('/api/delete_request', methods=['DELETE'])
 @jwt_required()
 def delete_request_action():
     user = jwt_current_user
-    if user.role != 'staff':
+    if not _is_current_staff(user):
         return jsonify(message='Access forbidden: Not a staff member'), 403
     data = request.json
     if not data or 'request_id' not in data:
         return jsonify(message='Invalid request data'), 400
     # Logic to delete the request goes here
-    req = Request.query.get(data['request_id'])
+    req = get_loader().get(Request, data['request_id'])
     if not req:
         return jsonify(message='Request not found'), 404
-    db.session.delete(req)
-    db.session.commit()
+    try:
+        # The versioned DELETE fails if a review or claim changed the request since it was read
+        with UnitOfWork():
+            db.session.delete(req)
+    except ConcurrentUpdateError:
+        return jsonify(message='Request was changed by another reviewer, reload and try again'), 409
     return jsonify(message='Request deleted'), 200
 
 @staff_views.route('/api/delete_logs', methods=['DELETE'])
 @jwt_required()
 def delete_logs_action():
     user = jwt_current_user
-    if user.role != 'staff':
+    if not _is_current_staff(user):
         return jsonify(message='Access forbidden: Not a staff member'), 403
     # Logic to delete logs goes here
     data = request.json
@@ -74,4 +165,36 @@ def delete_logs_action():
         return jsonify(message='Log not found'), 404
     db.session.delete(log)
     db.session.commit()
-    return jsonify(message='Logs deleted'), 200
\ No newline at end of file
+    return jsonify(message='Logs deleted'), 200
+
+def _export_response(export, name):
+    """Streams an export as NDJSON (default) or CSV, filtered by since/until."""
+    fmt = request.args.get('format', 'ndjson')
+    try:
+        chunks = export(fmt,
+                        since=parse_export_time(request.args.get('since')),
+                        until=parse_export_time(request.args.get('until')))
+    except ValueError as e:
+        return jsonify(message=str(e)), 400
+    extension = 'csv' if fmt == 'csv' else 'ndjson'
+    return Response(
+        stream_with_context(chunks),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename={name}.{extension}'}
+    )
+
+@staff_views.route('/api/export/history', methods=['GET'])
+@jwt_required()
+def export_history_action():
+    user = jwt_current_user
+    if user.role != 'staff':
+        return jsonify(message='Access forbidden: Not a staff member'), 403
+    return _export_response(export_history, 'history')
+
+@staff_views.route('/api/export/logged_hours', methods=['GET'])
+@jwt_required()
+def export_logged_hours_action():
+    user = jwt_current_user
+    if user.role != 'staff':
+        return jsonify(message='Access forbidden: Not a staff member'), 403
+    return _export_response(export_logged_hours, 'logged_hours')
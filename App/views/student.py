@@ -1,8 +1,9 @@
-from flask import Blueprint, render_template, jsonify, request, send_from_directory, flash, redirect, url_for
+from flask import Blueprint, render_template, jsonify, request, send_from_directory, flash, redirect, url_for, current_app
 from flask_jwt_extended import jwt_required, current_user as jwt_current_user
 from App.models import Student
 from.index import index_views
 from App.controllers.student_controller import get_all_students_json,fetch_accolades,create_hours_request
+from App.controllers.history import get_history_page
 
 student_views = Blueprint('student_views', __name__, template_folder='../templates')
 
@@ -17,6 +18,38 @@ def accolades_report_action():
         return jsonify(message='No accolades for this student'), 404
     return jsonify(report)
 
+@student_views.route('/api/history', methods=['GET'])
+@jwt_required()
+def history_action():
+    user = jwt_current_user
+    # Students read their own history; staff pass the student_id to look at
+    if user.role == 'student':
+        student_id = user.student_id
+    elif user.role == 'staff':
+        student_id = request.args.get('student_id', type=int)
+        if student_id is None:
+            return jsonify(message='student_id is required'), 400
+    else:
+        return jsonify(message='Access forbidden'), 403
+
+    limit = request.args.get('limit', current_app.config['HISTORY_PAGE_SIZE'], type=int)
+    max_page = current_app.config['HISTORY_MAX_PAGE_SIZE']
+    try:
+        if limit > max_page:
+            raise ValueError(f"limit must be at most {max_page}.")
+        entries, next_cursor = get_history_page(
+            student_id, limit,
+            before=request.args.get('before'),
+            command_type=request.args.get('command_type')
+        )
+    except ValueError as e:
+        return jsonify(message=str(e)), 400
+
+    response = jsonify(entries)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
 @student_views.route('/api/make_request', methods=['POST'])
 @jwt_required()
 def make_request_action():
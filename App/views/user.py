@@ -1,15 +1,22 @@
-from flask import Blueprint, render_template, jsonify, request, send_from_directory, flash, redirect, url_for
+from flask import Blueprint, render_template, jsonify, request, send_from_directory, flash, redirect, url_for, current_app
 from flask_jwt_extended import jwt_required, current_user as jwt_current_user
+from datetime import date
 from App.models import Student, Staff, User
 from.index import index_views
 from App.controllers.student_controller import get_all_students_json,register_student
 from App.controllers.staff_controller import get_all_staff_json,register_staff
+from App.controllers.leaderboard import get_leaderboard_cache
+from App.controllers.jobs import queue_stats
+from App.controllers.user import DuplicateUserError
 from App.controllers import (
     create_user,
     get_all_users,
     get_all_users_json,
     jwt_required,
     view_leaderboard,
+    view_leaderboard_page,
+    view_window_leaderboard,
+    view_student_rank,
     get_all_requests_json,
     get_all_logged_hours_json
 )
@@ -42,25 +49,21 @@ def create_user_endpoint():
 @user_views.route('/api/create_Student', methods=['POST'])
 def create_student_endpoint():
     data = request.json
-    
-    users = User.query.all()
-    for u in users:
-        if u.email == data['email'] or u.username == data['name']:
-            return jsonify({'message': f"User with email {data['email']} already exists or username {data['name']}."}), 400
-    
-    student = register_student(data['name'], data['email'], data['password'])
+
+    try:
+        student = register_student(data['name'], data['email'], data['password'])
+    except DuplicateUserError:
+        return jsonify({'message': f"User with email {data['email']} already exists or username {data['name']}."}), 400
     return jsonify({'message': f"Student {student.username} created with id {student.student_id}"})
 
 @user_views.route('/api/create_Staff', methods=['POST'])
 def create_staff_endpoint():
     data = request.json
 
-    users = User.query.all()
-    for u in users:
-        if u.email == data['email'] or u.username == data['name']:
-            return jsonify({'message': f"User with email {data['email']} already exists or username {data['name']}."}), 400
-
-    staff = register_staff(data['name'], data['email'], data['password'])
+    try:
+        staff = register_staff(data['name'], data['email'], data['password'])
+    except DuplicateUserError:
+        return jsonify({'message': f"User with email {data['email']} already exists or username {data['name']}."}), 400
     return jsonify({'message': f"Staff {staff.username} created with id {staff.staff_id}"})
 
 @user_views.route('/static/users', methods=['GET'])
@@ -80,8 +83,58 @@ def get_staff_action():
 
 @user_views.route('/api/leaderboard', methods=['GET'])
 def leaderboard_action():
-    leaderboard = view_leaderboard()
-    return jsonify(leaderboard)
+    limit = request.args.get('limit', type=int)
+    offset = request.args.get('offset', type=int)
+    tie_break = request.args.get('tie_break')
+    after = request.args.get('after')
+    max_page = current_app.config['LEADERBOARD_MAX_PAGE_SIZE']
+
+    window = request.args.get('window')
+
+    # Keyset pages only when a cursor is given (an empty after= asks for the first page),
+    # so offset clients keep their response whatever parameters they send
+    keyset = after is not None
+    try:
+        if limit is not None and limit > max_page:
+            raise ValueError(f"limit must be at most {max_page}.")
+        if window is not None:
+            if after is not None or tie_break is not None:
+                raise ValueError("window cannot be combined with after or tie_break.")
+            start = date.fromisoformat(request.args['from']) if request.args.get('from') else None
+            end = date.fromisoformat(request.args['to']) if request.args.get('to') else None
+            leaderboard = view_window_leaderboard(window, start, end, limit=limit, offset=offset or 0)
+            next_cursor = None
+        elif keyset:
+            if offset is not None or tie_break is not None:
+                raise ValueError("after cannot be combined with offset or tie_break.")
+            limit = limit if limit is not None else current_app.config['LEADERBOARD_PAGE_SIZE']
+            leaderboard, next_cursor = view_leaderboard_page(limit, after)
+        else:
+            leaderboard = view_leaderboard(limit=limit, offset=offset or 0, tie_break=tie_break or 'student_id')
+            next_cursor = None
+    except ValueError as e:
+        return jsonify(message=str(e)), 400
+
+    response = jsonify(leaderboard)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+@user_views.route('/api/leaderboard/rank/<int:student_id>', methods=['GET'])
+def leaderboard_rank_action(student_id):
+    rank = view_student_rank(student_id)
+    if not rank:
+        return jsonify(message='Student not found'), 404
+    return jsonify(rank)
+
+@user_views.route('/api/leaderboard/cache', methods=['GET'])
+def leaderboard_cache_action():
+    # Counters are per worker process
+    return jsonify(get_leaderboard_cache().stats())
+
+@user_views.route('/api/jobs/stats', methods=['GET'])
+def job_stats_action():
+    return jsonify(queue_stats())
 
 @user_views.route('/api/requests', methods=['GET'])
 def requests_action():
@@ -0,0 +1,59 @@
+"""Accolade recompute benchmark: AccoladeCommand per student vs the bulk recompute job.
+
+Usage (from the repository root):
+    python -m benchmarks.accolade_recompute_benchmark --sizes 1000 100000
+"""
+import argparse
+
+from App.database import db
+from App.models import Student, StudentAccolade, ActivityHistory
+from App.commands.AccoladeCommand import AccoladeCommand
+from App.controllers.activity_log import ActivityLog
+from App.controllers.accolades import recompute_accolades
+from App.controllers.unit_of_work import UnitOfWork
+from benchmarks.common import make_app, seed_students, QueryCounter, timer
+
+
+def per_student_loop():
+    """What the recompute replaces: one AccoladeCommand (and its log entry) per student."""
+    for student in db.session.scalars(db.select(Student)).all():
+        command = AccoladeCommand(student)
+        with UnitOfWork() as uow:
+            if uow.run(command):
+                ActivityLog.log_command_execution(command, student.student_id)
+
+
+def reset_awards():
+    db.session.execute(db.delete(StudentAccolade))
+    db.session.execute(db.delete(ActivityHistory))
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000])
+    parser.add_argument('--loop-max', type=int, default=1000,
+                        help='largest size to run the per-student loop on')
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        make_app()
+        # 8 logs of 1-13 hours each puts most students past several tiers
+        seed_students(size, logs_per_student=8)
+        print(f"\n{size} students")
+
+        if size <= args.loop_max:
+            with QueryCounter() as counter, timer() as elapsed:
+                per_student_loop()
+            awards = db.session.scalar(db.select(db.func.count(StudentAccolade.id)))
+            print(f"  per-student AccoladeCommand  {elapsed['elapsed']:8.2f}s  queries={counter.count:<8} awards={awards}")
+            reset_awards()
+
+        with QueryCounter() as counter:
+            result = recompute_accolades()
+        print(f"  bulk recompute               {result['elapsed']:8.2f}s  queries={counter.count:<8} awards={result['awards']}"
+              f"  ({result['students'] / result['elapsed']:,.0f} students/s)")
+
+
+if __name__ == '__main__':
+    main()
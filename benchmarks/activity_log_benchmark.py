@@ -0,0 +1,62 @@
+"""Activity log benchmark: accolade entries written with each action vs buffered per worker.
+
+Usage (from the repository root):
+    python -m benchmarks.activity_log_benchmark --entries 5000
+"""
+import argparse, time
+
+from flask import current_app
+
+from App.database import db
+from App.models import Student, ActivityHistory
+from App.commands.AccoladeCommand import AccoladeCommand
+from App.controllers.activity_log import ActivityLog, flush_activity_log
+from App.controllers.unit_of_work import UnitOfWork
+from benchmarks.common import make_app, seed_students, summarize, QueryCounter
+
+
+def log_accolades(commands, count):
+    """Logs `count` accolade entries, one action (and commit) each, flushing as after_request would."""
+    samples = []
+    for n in range(count):
+        student_id, command = commands[n % len(commands)]
+        start = time.perf_counter()
+        with UnitOfWork():
+            ActivityLog.log_command_execution(command, student_id)
+        flush_activity_log()
+        samples.append((time.perf_counter() - start) * 1000)
+    flush_activity_log(force=True)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entries', type=int, default=5000)
+    parser.add_argument('--buffer-size', type=int, default=500)
+    args = parser.parse_args()
+
+    make_app({'ACTIVITY_LOG_BUFFER_SIZE': args.buffer_size})
+    seed_students(100, logs_per_student=1)
+    commands = []
+    for student in db.session.scalars(db.select(Student)).all():
+        command = AccoladeCommand(student)
+        command.accolades_awarded = ['10 Hours Milestone']
+        commands.append((student.student_id, command))
+
+    for mode in ('sync', 'worker'):
+        current_app.config['ACTIVITY_LOG_MODE'] = mode
+        db.session.execute(db.delete(ActivityHistory))
+        db.session.commit()
+
+        with QueryCounter() as counter:
+            start = time.perf_counter()
+            samples = log_accolades(commands, args.entries)
+            elapsed = time.perf_counter() - start
+        written = db.session.scalar(db.select(db.func.count(ActivityHistory.id)))
+        stats = summarize(samples)
+        print(f"  {mode:<7} {written / elapsed:10,.0f} entries/s  statements={counter.count:<7}"
+              f" p50={stats['p50']:6.3f}ms  p99={stats['p99']:6.3f}ms  written={written}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Leaderboard benchmark: per-student relationship scan vs the summary-backed queries.
+
+Usage (from the repository root):
+    python -m benchmarks.leaderboard_benchmark --sizes 10000 100000
+"""
+import argparse
+
+from App.database import db
+from App.models import Student
+from App.controllers.leaderboard import get_leaderboard, get_leaderboard_page, get_student_rank, encode_cursor
+from benchmarks.common import make_app, seed_students, measure, timer
+
+
+def legacy_leaderboard():
+    """The previous implementation: lazy-loads every student's logged hours."""
+    students = db.session.scalars(db.select(Student)).all()
+    leaderboard = []
+    for student in students:
+        total_hours = sum(lh.hours for lh in student.loggedhours if lh.status == 'approved')
+        leaderboard.append({
+            'student_id': student.student_id,
+            'username': student.username,
+            'total_approved_hours': total_hours
+        })
+    leaderboard.sort(key=lambda x: x['total_approved_hours'], reverse=True)
+    return leaderboard
+
+
+def report(label, queries, stats):
+    print(f"  {label:<28} queries/call={queries:<8.0f} "
+          f"mean={stats['mean']:9.1f}ms p50={stats['p50']:9.1f}ms p99={stats['p99']:9.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--legacy-max', type=int, default=10000,
+                        help='largest size to run the (very slow) legacy scan on')
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        make_app()
+        with timer() as seeding:
+            seed_students(size)
+        print(f"\n{size} students (seeded in {seeding['elapsed']:.1f}s)")
+
+        if size <= args.legacy_max:
+            report('legacy relationship scan', *measure(legacy_leaderboard, repeat=args.repeat))
+        board = get_leaderboard(use_cache=False)
+        middle = board[len(board) // 2]
+        deep_cursor = encode_cursor(middle['total_hours'], middle['student_id'])
+
+        report('full board', *measure(lambda: get_leaderboard(use_cache=False), repeat=args.repeat))
+        report('offset page, limit=50', *measure(lambda: get_leaderboard(limit=50, use_cache=False), repeat=args.repeat))
+        report('keyset page, first 50', *measure(lambda: get_leaderboard_page(50, use_cache=False), repeat=args.repeat))
+        report('keyset page, mid-board 50', *measure(lambda: get_leaderboard_page(50, deep_cursor, use_cache=False), repeat=args.repeat))
+        report('rank lookup, mid-board', *measure(lambda: get_student_rank(middle['student_id']), repeat=args.repeat))
+        report('cached page, limit=50', *measure(lambda: get_leaderboard(limit=50), repeat=args.repeat))
+
+
+if __name__ == '__main__':
+    main()
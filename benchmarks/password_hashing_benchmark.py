@@ -0,0 +1,78 @@
+"""Password hashing benchmark: login burst on a gevent worker, hashing inline vs in a process pool.
+
+Logins run in greenlets, as under gunicorn's gevent worker class, while a probe
+greenlet keeps calling a cheap endpoint. Inline hashing stalls the probe for the
+whole burst; with a pool the event loop keeps serving it.
+
+Requires gevent (commented out in requirements.txt). Usage (from the repository root):
+    python -m benchmarks.password_hashing_benchmark --logins 40 --concurrency 8 --workers 2
+"""
+from gevent import monkey
+monkey.patch_all()
+
+import argparse, time
+
+import gevent, gevent.event
+
+from App.passwords import shutdown_hash_pool
+from benchmarks.common import make_app, seed_students, summarize
+
+PROBE_INTERVAL = 0.01
+
+
+def probe(client, samples, done):
+    """Calls the leaderboard every PROBE_INTERVAL, recording how late each response arrives."""
+    while not done.is_set():
+        due = time.perf_counter() + PROBE_INTERVAL
+        gevent.sleep(PROBE_INTERVAL)
+        client.get('/api/leaderboard?limit=10')
+        samples.append((time.perf_counter() - due) * 1000)
+
+
+def login_burst(client, usernames, logins, concurrency):
+    """Runs `logins` logins spread over `concurrency` greenlets. Returns (per-login ms, elapsed s)."""
+    latencies = []
+
+    def worker(offset):
+        for n in range(offset, logins, concurrency):
+            start = time.perf_counter()
+            response = client.post('/api/login', json={'username': usernames[n % len(usernames)],
+                                                       'password': 'benchpass'})
+            assert response.status_code == 200, response.get_data(as_text=True)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    gevent.joinall([gevent.spawn(worker, offset) for offset in range(concurrency)])
+    return latencies, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--logins', type=int, default=40)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=2, help='PASSWORD_HASH_WORKERS for the pooled run')
+    args = parser.parse_args()
+
+    app = make_app()
+    seed_students(50, logs_per_student=1)
+    usernames = [f'student{i}' for i in range(2, 52)]
+    client = app.test_client()
+
+    for label, workers in (('inline', 0), (f'pool={args.workers}', args.workers)):
+        app.config['PASSWORD_HASH_WORKERS'] = workers
+        client.post('/api/login', json={'username': usernames[0], 'password': 'benchpass'})  # starts the pool
+
+        probes, done = [], gevent.event.Event()
+        prober = gevent.spawn(probe, client, probes, done)
+        latencies, elapsed = login_burst(client, usernames, args.logins, args.concurrency)
+        done.set()
+        prober.join()
+
+        logins, other = summarize(latencies), summarize(probes)
+        print(f"  {label:<8} {args.logins / elapsed:6.1f} logins/s  login p99={logins['p99']:8.1f}ms"
+              f"  other endpoint p50={other['p50']:7.1f}ms p99={other['p99']:7.1f}ms ({len(probes)} calls)")
+        shutdown_hash_pool()
+
+
+if __name__ == '__main__':
+    main()
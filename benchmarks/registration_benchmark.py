@@ -0,0 +1,61 @@
+"""Registration benchmark: duplicate check by scanning every user vs one indexed lookup.
+
+Seeds --existing students, then registers new students with the old check (load
+all users, compare in Python) and with register_student's indexed existence check.
+Passwords use a minimal pbkdf2 work factor so hashing does not hide the check.
+
+Usage (from the repository root):
+    python -m benchmarks.registration_benchmark --existing 100000 --registrations 200
+"""
+import argparse, time
+
+from App.database import db
+from App.models import User, Student
+from App.controllers.student_controller import register_student
+from benchmarks.common import make_app, seed_students, summarize, QueryCounter
+
+
+def scan_register(name, email, password):
+    """The check the create_Student endpoint used to run before registering."""
+    for user in User.query.all():
+        if user.email == email or user.username == name:
+            return None
+    return Student.create_student(name, email, password)
+
+
+def run(register, prefix, count):
+    samples = []
+    with QueryCounter() as counter:
+        start = time.perf_counter()
+        for n in range(count):
+            begin = time.perf_counter()
+            assert register(f'{prefix}{n}', f'{prefix}{n}@example.com', 'benchpass') is not None
+            samples.append((time.perf_counter() - begin) * 1000)
+            db.session.expunge_all()  # each registration is a fresh request
+        elapsed = time.perf_counter() - start
+    return count / elapsed, counter.count / count, summarize(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--existing', type=int, default=100000)
+    parser.add_argument('--registrations', type=int, default=200)
+    parser.add_argument('--scan-registrations', type=int, default=5,
+                        help='registrations timed with the full scan, which is slow at large sizes')
+    args = parser.parse_args()
+
+    make_app({'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1'})
+    seed_students(args.existing, logs_per_student=1)
+    print(f"{args.existing:,} existing users")
+
+    for label, register, prefix, count in (
+        ('full scan', scan_register, 'scanned', args.scan_registrations),
+        ('indexed', register_student, 'indexed', args.registrations),
+    ):
+        rate, statements, stats = run(register, prefix, count)
+        print(f"  {label:<10} {rate:10,.1f} registrations/s  statements={statements:4.1f}"
+              f"  p50={stats['p50']:9.2f}ms  p99={stats['p99']:9.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""Token cache microbenchmark: per-request authentication cost with and without the decoded-token cache.
+
+Times verify_jwt_in_request() (decode, signature check and principal lookup) for
+the same token presented repeatedly, then a full GET /api/identify round trip.
+
+Usage (from the repository root):
+    python -m benchmarks.token_cache_benchmark --requests 5000
+"""
+import argparse, time
+
+from flask_jwt_extended import verify_jwt_in_request
+
+from App.controllers.auth import login, TokenCache
+from App.controllers.student_controller import register_student
+from benchmarks.common import make_app, summarize
+
+
+def time_calls(count, call):
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        call()
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=5000)
+    args = parser.parse_args()
+
+    app = make_app()
+    register_student('tokenbench', 'tokenbench@example.com', 'benchpass')
+    token = login('tokenbench', 'benchpass')
+    headers = {'Authorization': f'Bearer {token}'}
+    manager = app.extensions['flask-jwt-extended']
+    client = app.test_client()
+
+    for label, cache in (('no cache', None), ('cache', TokenCache(1024))):
+        manager.token_cache = cache
+        client.get('/api/identify', headers=headers)  # warms the principal cache
+        with app.test_request_context('/api/identify', headers=headers):
+            auth = time_calls(args.requests, verify_jwt_in_request)
+        full = time_calls(args.requests, lambda: client.get('/api/identify', headers=headers))
+        print(f"  {label:<9} verify mean={auth['mean'] * 1000:6.1f}us p99={auth['p99'] * 1000:6.1f}us"
+              f"   GET /api/identify mean={full['mean']:6.3f}ms p99={full['p99']:6.3f}ms")
+
+
+if __name__ == '__main__':
+    main()
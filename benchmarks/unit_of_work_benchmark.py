@@ -0,0 +1,120 @@
+"""Unit of work benchmark: commits and latency per staff/student action, per-step commits vs one commit.
+
+Usage (from the repository root):
+    python -m benchmarks.unit_of_work_benchmark --actions 500
+"""
+import argparse, time
+
+from App.database import db
+from App.models import Staff, Student, Request
+from App.commands.LogHoursCommand import LogHoursCommand
+from App.commands.DenyRequestCommand import DenyRequestCommand
+from App.commands.RequestCommand import RequestCommand
+from App.commands.AccoladeCommand import AccoladeCommand
+from App.controllers.activity_log import ActivityLog
+from App.controllers.staff_invoker import StaffService
+from App.controllers.student_invoker import StudentService
+from benchmarks.common import make_app, seed_students, summarize
+
+
+class CommitCounter():
+    """Counts session commits while active."""
+
+    def __init__(self):
+        self.count = 0
+
+    def _on_commit(self, session):
+        self.count += 1
+
+    def __enter__(self):
+        db.event.listen(db.session, 'after_commit', self._on_commit)
+        return self
+
+    def __exit__(self, *exc):
+        db.event.remove(db.session, 'after_commit', self._on_commit)
+
+
+# What the invokers did before the unit of work: every command and log entry committed itself
+
+def per_step_approve(staff_id, request_id):
+    staff = Staff.query.get(staff_id)
+    request = Request.query.get(request_id)
+    student = Student.query.get(request.student_id)
+    command = LogHoursCommand(request, staff)
+    new_logged = command.execute()
+    db.session.commit()
+    ActivityLog.log_command_execution(command, request.student_id)
+    db.session.commit()
+    previous_total = student.get_total_approved_hours() - new_logged.hours
+    accolade_command = AccoladeCommand(student, staff, previous_total)
+    if accolade_command.execute():
+        ActivityLog.log_command_execution(accolade_command, student.student_id, staff_id)
+        db.session.commit()
+
+
+def per_step_deny(staff_id, request_id):
+    staff = Staff.query.get(staff_id)
+    request = Request.query.get(request_id)
+    command = DenyRequestCommand(request=request, staff=staff)
+    if command.execute():
+        db.session.commit()
+        ActivityLog.log_command_execution(command, request.student_id, staff_id)
+        db.session.commit()
+
+
+def per_step_request(student_id, hours):
+    student = Student.query.get(student_id)
+    command = RequestCommand(student=student, hours=hours)
+    command.execute()
+    db.session.commit()
+    ActivityLog.log_command_execution(command, student_id, staff_id=None)
+    db.session.commit()
+
+
+def pending_requests(student_ids, count, hours):
+    requests = [Request(student_ids[i % len(student_ids)], hours) for i in range(count)]
+    db.session.add_all(requests)
+    db.session.commit()
+    return [req.id for req in requests]
+
+
+def run(label, action, arguments):
+    samples = []
+    with CommitCounter() as commits:
+        for args in arguments:
+            db.session.expire_all()
+            start = time.perf_counter()
+            action(*args)
+            samples.append((time.perf_counter() - start) * 1000)
+    stats = summarize(samples)
+    print(f"  {label:<28} commits/action={commits.count / len(arguments):4.2f}"
+          f"  mean={stats['mean']:7.2f}ms  p50={stats['p50']:7.2f}ms  p99={stats['p99']:7.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--actions', type=int, default=500, help='actions timed per path')
+    args = parser.parse_args()
+
+    make_app()
+    staff, student_ids = seed_students(args.actions, logs_per_student=1)
+    staff_id = staff.staff_id
+
+    # Hours large enough that most approvals also award a milestone
+    for label, approve in (('approve (commit per step)', per_step_approve),
+                           ('approve (unit of work)', StaffService.approve_request_action)):
+        ids = pending_requests(student_ids, args.actions, 9.0)
+        run(label, approve, [(staff_id, request_id) for request_id in ids])
+
+    for label, deny in (('deny (commit per step)', per_step_deny),
+                        ('deny (unit of work)', StaffService.deny_request_action)):
+        ids = pending_requests(student_ids, args.actions, 1.0)
+        run(label, deny, [(staff_id, request_id) for request_id in ids])
+
+    for label, create in (('request (commit per step)', per_step_request),
+                          ('request (unit of work)', StudentService.create_hours_request)):
+        run(label, create, [(student_id, 1.0) for student_id in student_ids])
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,4 @@
-import click, pytest, sys
+import click, pytest, sys, time
 from flask.cli import with_appcontext, AppGroup
 
 from App.database import db, get_migrate
@@ -10,7 +10,15 @@ from App.main import create_app
 from App.controllers.student_controller import *
 from App.controllers.staff_controller import *
 from App.controllers.app_controller import *
-from App.controllers import ( create_user, get_all_users_json, get_all_users, initialize )
+from App.controllers import ( create_user, get_all_users_json, get_all_users, initialize, create_user_indexes )
+from App.controllers.hours_summary import rebuild_hours_summaries, check_hours_summaries, rebuild_daily_hours
+from App.controllers.accolades import backfill_student_accolades, recompute_accolades
+from App.controllers.milestones import get_all_milestones, add_milestone, remove_milestone
+from App.controllers.jobs import run_pending_jobs, queue_stats, purge_finished_jobs
+from App.controllers.history import create_history_indexes, archive_history, upgrade_history_schema
+from App.controllers.activity_log import flush_activity_log
+from App.controllers.request_queue import upgrade_request_schema
+from datetime import timedelta
 
 
 '''APP COMMANDS(TESTING PURPOSES)'''
@@ -33,6 +41,23 @@ def listUsers():
     listAllUsers()
 
 
+#Command to add the case-insensitive username/email indexes to a database created before they existed
+@app.cli.command("createUserIndexes", help="Create the case-insensitive unique username and email indexes")
+def createUserIndexes():
+    try:
+        for name in create_user_indexes():
+            print(f"Index {name} is in place.")
+    except ValueError as e:
+        print(f"An error occurred: {e}")
+
+
+#Command to add the review lease and version columns to a request table created before they existed
+@app.cli.command("upgradeRequests", help="Add missing request columns and indexes")
+def upgradeRequests():
+    added = upgrade_request_schema()
+    print(f"Added request columns: {', '.join(added)}." if added else "Request schema is up to date.")
+
+
 #Comamand to list all staff in the database
 @app.cli.command ("listStaff", help="Lists all staff in the database")
 def listStaff():
@@ -293,7 +318,7 @@ def approveRequest():
         if logged:
             print(f"Request {request_id} for {req.hours} hours made by {student_name} approved by Staff {staff_name} (ID: {staff_id}). LoggedHours ID: {logged.id}")
         else:
-            print(f"Request {request_id} for {req.hours} hours made by {student_name} could not be approved (Already Processed).")
+            print(f"Request {request_id} for {req.hours} hours made by {student_name} could not be approved: {results['message']}")
     
     except ValueError as e:
         print(f"Error: {e}")
@@ -353,6 +378,177 @@ app.cli.add_command(staff_cli) # add the group to the cli
 
 
 
+'''HOURS SUMMARY COMMANDS'''
+
+summary_cli = AppGroup('summary', help='Per-student hours summary commands')
+
+#Command to rebuild every student's hours summary from LoggedHours and Request
+@summary_cli.command("rebuild", help="Rebuild the hours summary table from logged hours and requests")
+def rebuildSummary():
+    count = rebuild_hours_summaries()
+    print(f"Rebuilt hours summaries for {count} students.")
+
+
+#Command to compare the hours summary table against LoggedHours and Request
+@summary_cli.command("check", help="Check the hours summary table against logged hours and requests")
+def checkSummary():
+    mismatches = check_hours_summaries()
+    if not mismatches:
+        print("Hours summaries are consistent.")
+        return
+    for m in mismatches:
+        print(f"Student {m['student_id']:<6} {m['field']:<15} expected={m['expected']} actual={m['actual']}")
+    print(f"{len(mismatches)} mismatches found. Run 'flask summary rebuild' to repair.")
+    sys.exit(1)
+
+
+#Command to backfill the per-day approved hours buckets used by windowed leaderboards
+@summary_cli.command("backfillDaily", help="Rebuild the daily approved hours buckets from logged hours")
+def backfillDaily():
+    count = rebuild_daily_hours()
+    print(f"Rebuilt {count} daily hours buckets.")
+
+app.cli.add_command(summary_cli) # add the group to the cli
+
+
+
+'''ACCOLADE COMMANDS'''
+
+accolades_cli = AppGroup('accolades', help='Accolade maintenance commands')
+
+#Command to migrate milestones found in activity history descriptions into the accolade table
+@accolades_cli.command("backfill", help="Backfill awarded accolades from activity history")
+def backfillAccolades():
+    count = backfill_student_accolades()
+    print(f"Backfilled {count} accolades from activity history.")
+
+
+#Command to award every milestone students have reached but not received (e.g. after tier changes or imports)
+@accolades_cli.command("recompute", help="Re-evaluate accolades for every student in bulk")
+@click.option("--chunk-size", default=5000, help="Students evaluated per insert batch")
+def recomputeAccolades(chunk_size):
+    started = time.perf_counter()
+
+    def progress(done, total, awards):
+        rate = done / max(time.perf_counter() - started, 1e-9)
+        print(f"Processed {done}/{total} students, {awards} new awards ({rate:,.0f} students/s)")
+
+    result = recompute_accolades(chunk_size=chunk_size, progress=progress)
+    print(f"Recomputed accolades for {result['students']} students: {result['awards']} awarded in {result['elapsed']:.2f}s.")
+
+
+#Command to list the configured milestone tiers
+@accolades_cli.command("listTiers", help="List milestone tiers")
+def listTiers():
+    for milestone in get_all_milestones():
+        print(milestone)
+
+
+#Command to add a milestone tier (name, hours)
+@accolades_cli.command("addTier", help="Add a milestone tier")
+@click.argument("name")
+@click.argument("hours", type=float)
+def addTier(name, hours):
+    try:
+        milestone = add_milestone(name, hours)
+        print(f"Added milestone tier: {milestone}")
+    except ValueError as e:
+        print(f"Error: {e}")
+
+
+#Command to remove a milestone tier that has not been awarded (milestone_id)
+@accolades_cli.command("removeTier", help="Remove a milestone tier that has not been awarded")
+@click.argument("milestone_id", type=int)
+def removeTier(milestone_id):
+    try:
+        remove_milestone(milestone_id)
+        print(f"Removed milestone tier {milestone_id}.")
+    except ValueError as e:
+        print(f"Error: {e}")
+
+app.cli.add_command(accolades_cli) # add the group to the cli
+
+
+
+'''BACKGROUND JOB COMMANDS'''
+
+#Command to run the background job worker (accolade checks queued by approvals)
+@app.cli.command("worker", help="Run queued background jobs until stopped")
+@click.option("--batch-size", type=int, default=None, help="Jobs claimed per batch (default JOB_BATCH_SIZE)")
+@click.option("--poll-interval", default=1.0, help="Seconds to sleep when the queue is empty")
+@click.option("--once", is_flag=True, help="Drain the queue and exit")
+def worker(batch_size, poll_interval, once):
+    retention = timedelta(hours=app.config['JOB_RETENTION_HOURS'])
+    print("Worker started. Press Ctrl+C to stop.")
+    try:
+        while True:
+            started = time.perf_counter()
+            counts = run_pending_jobs(batch_size)
+            flush_activity_log()
+            # Start each batch with an empty identity map
+            db.session.remove()
+            if counts['claimed']:
+                print(f"Ran {counts['claimed']} jobs in {time.perf_counter() - started:.2f}s: "
+                      f"{counts['done']} done, {counts['retried']} retried, {counts['failed']} failed. "
+                      f"{queue_stats()['queued']} queued.")
+                continue
+            if once:
+                break
+            purge_finished_jobs(retention)
+            time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        pass
+    print("Worker stopped.")
+
+
+jobs_cli = AppGroup('jobs', help='Background job queue commands')
+
+#Command to show queue depth and recent job latency
+@jobs_cli.command("stats", help="Show job queue depth and latency")
+def jobStats():
+    stats = queue_stats()
+    for status, kinds in sorted(stats['depth'].items()):
+        for kind, count in sorted(kinds.items()):
+            print(f"{status:<8} {kind:<20} {count}")
+    if stats['oldest_queued_seconds'] is not None:
+        print(f"Oldest queued job waiting {stats['oldest_queued_seconds']:.1f}s")
+    for label in ('wait_seconds', 'total_seconds'):
+        if stats[label]:
+            print(f"{label:<14} mean={stats[label]['mean']:.3f}s p95={stats[label]['p95']:.3f}s")
+
+app.cli.add_command(jobs_cli) # add the group to the cli
+
+
+
+'''ACTIVITY HISTORY COMMANDS'''
+
+history_cli = AppGroup('history', help='Activity history maintenance commands')
+
+#Command to add the activity history indexes to a database created before they existed
+@history_cli.command("createIndexes", help="Create missing activity history indexes")
+def createHistoryIndexes():
+    for name in create_history_indexes():
+        print(f"Index {name} is in place.")
+
+#Command to add the payload column to activity history tables made before it existed
+@history_cli.command("upgrade", help="Add missing activity history columns, tables and indexes")
+def upgradeHistory():
+    altered = upgrade_history_schema()
+    print(f"Added the payload column to: {', '.join(altered)}." if altered else "Activity history schema is up to date.")
+
+#Command to move old activity history entries into the archive table
+@history_cli.command("archive", help="Move activity history older than N days into the archive table")
+@click.option("--older-than", "older_than", type=click.IntRange(min=1), required=True, help="Age in days of the entries to archive")
+@click.option("--chunk-size", default=1000, type=click.IntRange(min=1), help="Entries moved per transaction")
+def archiveHistory(older_than, chunk_size):
+    moved = archive_history(timedelta(days=older_than), chunk_size,
+                            progress=lambda done: print(f"  {done} entries archived..."))
+    print(f"Archived {moved} activity history entries older than {older_than} days.")
+
+app.cli.add_command(history_cli) # add the group to the cli
+
+
+
 # '''
 # Test Commands
 # '''